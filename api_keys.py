@@ -0,0 +1,167 @@
+import os
+import asyncio
+import hmac
+import hashlib
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import Depends, HTTPException, Security, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
+from cache import TTLCache
+import auth
+import database
+import metrics
+import models
+
+# --- CONFIGURATION ---
+# Key used to HMAC API key secrets before storing them (defaults to SECRET_KEY).
+# Changing it invalidates every issued key.
+API_KEY_HMAC_SECRET = os.getenv("API_KEY_HMAC_SECRET") or auth.SECRET_KEY or ""
+# Verified keys are cached per worker; a revoked key keeps working on other
+# workers for at most API_KEY_CACHE_TTL_SECONDS.
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", 60))
+API_KEY_CACHE_MAX_SIZE = int(os.getenv("API_KEY_CACHE_MAX_SIZE", 10000))
+
+# Keys look like "nk_<prefix>_<secret>". The prefix is public and indexed; only
+# an HMAC of the secret is stored.
+KEY_MARKER = "nk_"
+COLLECTION = "api_keys"
+
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+# prefix -> {"key_hash", "username"}, or False for prefixes that do not exist
+key_cache = TTLCache(API_KEY_CACHE_MAX_SIZE, API_KEY_CACHE_TTL_SECONDS)
+metrics.registry.register_gauges("auth_api_key_cache", key_cache.stats)
+
+
+def hash_secret(secret: str) -> str:
+    # A keyed SHA-256 is enough: the secret is 256 random bits, not a password
+    return hmac.new(API_KEY_HMAC_SECRET.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def generate_key() -> tuple:
+    """
+    Returns (prefix, full key). The full key is only ever shown once.
+    """
+    prefix = secrets.token_hex(6)
+    return prefix, f"{KEY_MARKER}{prefix}_{secrets.token_urlsafe(32)}"
+
+
+def parse_key(api_key: str) -> Optional[tuple]:
+    """
+    Split a key into (prefix, secret), or None if it is malformed.
+    """
+    if not api_key.startswith(KEY_MARKER):
+        return None
+    prefix, _, secret = api_key[len(KEY_MARKER):].partition("_")
+    if not prefix or not secret:
+        return None
+    return prefix, secret
+
+
+async def ensure_indexes(db):
+    await asyncio.gather(
+        db[COLLECTION].create_index("prefix", unique=True),
+        db[COLLECTION].create_index("username"),
+    )
+
+
+async def issue_key(db, username: str, name: str) -> tuple:
+    """
+    Store a new key for `username`. Returns (document, full key).
+    """
+    prefix, api_key = generate_key()
+    key_doc = models.APIKeyInDB(
+        prefix=prefix,
+        key_hash=hash_secret(parse_key(api_key)[1]),
+        username=username,
+        name=name,
+        created_at=datetime.now(timezone.utc),
+    ).model_dump()
+    result = await db[COLLECTION].insert_one(key_doc)
+    key_doc["_id"] = result.inserted_id
+    return key_doc, api_key
+
+
+async def list_keys(db, username: str) -> list:
+    return await db[COLLECTION].find(
+        {"username": username}, {"key_hash": 0}
+    ).sort("created_at", 1).to_list(None)
+
+
+async def revoke_key(db, prefix: str, username: Optional[str] = None) -> bool:
+    """
+    Delete a key, only if it belongs to `username` when one is given.
+    """
+    query = {"prefix": prefix}
+    if username is not None:
+        query["username"] = username
+    result = await db[COLLECTION].delete_one(query)
+    key_cache.pop(prefix)
+    return result.deleted_count > 0
+
+
+async def authenticate(db, api_key: str) -> Optional[dict]:
+    """
+    Resolve an API key to its (active) user, or None.
+    Normally served from memory: the key cache, then the user cache.
+    """
+    parsed = parse_key(api_key)
+    if parsed is None:
+        return None
+    prefix, secret = parsed
+
+    entry = key_cache.get(prefix)
+    if entry is None:
+        key_doc = await db[COLLECTION].find_one(
+            {"prefix": prefix}, {"_id": 0, "key_hash": 1, "username": 1}
+        )
+        entry = key_doc or False
+        key_cache.set(prefix, entry)
+    if not entry or not hmac.compare_digest(entry["key_hash"], hash_secret(secret)):
+        return None
+
+    username = entry["username"]
+    return await auth.user_cache.get_or_load(
+        username,
+        lambda: database.find_user_for_auth(db, username),
+    )
+
+
+async def get_current_user_from_api_key(
+    api_key: Optional[str] = Security(api_key_header), db = Depends(database.get_db)
+):
+    """
+    Async dependency authenticating a node by its X-API-Key header.
+    """
+    user = await authenticate(db, api_key) if api_key else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+            headers={"WWW-Authenticate": "APIKey"},
+        )
+    return user
+
+
+async def require_user_or_api_key(
+    api_key: Optional[str] = Security(api_key_header),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db = Depends(database.get_db),
+):
+    """
+    Async dependency accepting either an X-API-Key header or a bearer token
+    (checked the same way as auth.require_user).
+    """
+    if api_key:
+        return await get_current_user_from_api_key(api_key, db)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if auth.TRUSTED_CLAIMS:
+        return await auth.get_current_user_from_claims(token)
+    return await auth.get_current_user(token, db)
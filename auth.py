@@ -1,32 +1,341 @@
 from datetime import datetime, timedelta, timezone
 import os
+import math
+import time
+import functools
+import uuid
+import hashlib
+import asyncio
+from concurrent.futures import BrokenExecutor
 from dotenv import load_dotenv
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Awaitable, Callable, Optional
+from jose import JWTError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
-import schemas, database
+from pymongo import ReturnDocument
+import schemas, database, metrics
+from cache import TTLCache, UserCache
+import token_store
+import signing_keys
 import logging
 
 # --- CONFIGURATION ---
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = "HS256"
-ALGORITHM = "HS256"
+# HS256 (SECRET_KEY), or RS256/ES256 with the keys in JWT_KEYS_DIR (see signing_keys.py)
+ALGORITHM = signing_keys.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing pool. bcrypt costs 100-300 ms of CPU per call, so it runs in
+# worker processes instead of on the event loop. HASH_POOL_WORKERS=0 falls back
+# to the loop's default thread pool (handy for local development).
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1))
+# Maximum hashes queued or running at once before we answer 503.
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", max(HASH_POOL_WORKERS, 1) * 4))
+
+# In-process cache of user documents used by get_current_user.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
+# Cache of verified JWT payloads, keyed by a hash of the raw token.
+JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", 10000))
+JWT_CACHE_MAX_BYTES = int(os.getenv("JWT_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+# Role allowed to use administrative endpoints such as /register/bulk.
+ADMIN_ROLE = os.getenv("ADMIN_ROLE", "role_admin")
+
+# Trusted claims mode: access tokens carry role/is_active so protected routes
+# can authenticate without a database lookup.
+TRUSTED_CLAIMS = os.getenv("TRUSTED_CLAIMS", "false").lower() in ("1", "true", "yes")
+# Token revocations are shared through MongoDB; each worker reloads them at most
+# this often, so a revocation takes effect everywhere within this many seconds.
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", 5))
+
+# Password hashing schemes, e.g. "argon2,bcrypt" (argon2 needs the argon2-cffi
+# package). New hashes use the first scheme; hashes in the others, or with a
+# lower cost, are upgraded on the next successful login.
+PASSWORD_SCHEMES = [scheme.strip() for scheme in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if scheme.strip()]
+# Cost of new hashes (bcrypt log2 rounds / argon2 time cost). When unset and
+# PASSWORD_HASH_TARGET_MS is set, the cost is calibrated on startup instead.
+PASSWORD_HASH_COST = os.getenv("PASSWORD_HASH_COST")
+PASSWORD_HASH_TARGET_MS = os.getenv("PASSWORD_HASH_TARGET_MS")
+# Cost bounds per scheme, and the cost used for calibration measurements
+HASH_COST_RANGES = {"bcrypt": (10, 16), "argon2": (2, 20)}
+HASH_CALIBRATION_COST = {"bcrypt": 10, "argon2": 2}
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+logger = logging.getLogger(__name__)
+key_ring = signing_keys.KeyRing(ALGORITHM, SECRET_KEY, signing_keys.JWT_KEYS_DIR, signing_keys.JWT_ACTIVE_KID)
 
 # --- UTILITY FUNCTIONS ---
 
+def build_password_settings(schemes: list, cost: Optional[int] = None) -> tuple:
+    """
+    CryptContext settings as a hashable tuple, so they can be sent to the
+    hashing workers and used as a cache key there.
+    """
+    settings = {"schemes": ",".join(schemes), "deprecated": "auto"}
+    if cost is not None and schemes[0] in HASH_COST_RANGES:
+        settings[f"{schemes[0]}__default_rounds"] = cost
+        # Existing hashes below the current cost report needs_update()
+        settings[f"{schemes[0]}__min_rounds"] = cost
+    return tuple(sorted(settings.items()))
+
+@functools.lru_cache(maxsize=8)
+def get_password_context(settings: tuple):
+    """
+    passlib CryptContext for the settings. passlib and the hash backends are
+    imported on first use, which keeps them off the startup path.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(**dict(settings))
+
+def _verify_with(settings, plain_password, hashed_password):
+    return get_password_context(settings).verify(plain_password, hashed_password)
+
+def _hash_with(settings, password):
+    return get_password_context(settings).hash(password)
+
+password_settings = build_password_settings(
+    PASSWORD_SCHEMES, int(PASSWORD_HASH_COST) if PASSWORD_HASH_COST else None
+)
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context(password_settings).verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_password_context(password_settings).hash(password)
+
+def password_needs_update(hashed_password) -> bool:
+    """
+    True if the hash uses a deprecated scheme or a lower cost than configured.
+    Only parses the hash, so it is cheap enough to call on every login.
+    """
+    return get_password_context(password_settings).needs_update(hashed_password)
+
+def calibrate_hash_cost(scheme: str, target_ms: float) -> int:
+    """
+    Measure hashing speed on this host and return the highest cost whose
+    hash time stays within target_ms (clamped to HASH_COST_RANGES).
+    """
+    base = HASH_CALIBRATION_COST[scheme]
+    context = get_password_context(build_password_settings([scheme], base))
+    context.hash("calibration")  # load the backend before timing
+    started = time.perf_counter()
+    context.hash("calibration")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if scheme == "bcrypt":
+        # bcrypt cost is log2 of the iteration count
+        cost = base + math.floor(math.log2(target_ms / elapsed_ms))
+    else:
+        # argon2 time cost scales linearly
+        cost = math.floor(base * target_ms / elapsed_ms)
+    low, high = HASH_COST_RANGES[scheme]
+    return max(low, min(high, cost))
+
+def configure_password_hashing() -> Optional[int]:
+    """
+    Apply PASSWORD_SCHEMES with PASSWORD_HASH_COST, or with a cost calibrated
+    against PASSWORD_HASH_TARGET_MS. Blocks for a few hashes when calibrating,
+    so run it off the event loop. Returns the cost in use (None = default).
+    """
+    global password_settings, _dummy_hash
+    cost = int(PASSWORD_HASH_COST) if PASSWORD_HASH_COST else None
+    if cost is None and PASSWORD_HASH_TARGET_MS and PASSWORD_SCHEMES[0] in HASH_COST_RANGES:
+        cost = calibrate_hash_cost(PASSWORD_SCHEMES[0], float(PASSWORD_HASH_TARGET_MS))
+    password_settings = build_password_settings(PASSWORD_SCHEMES, cost)
+    _dummy_hash = None
+    return cost
+
+_dummy_hash = None
+
+# --- PASSWORD HASHING POOL ---
+
+class HashPool:
+    """
+    Bounded worker pool for password hashing.
+    Requests beyond max_pending are rejected with a 503 instead of queueing
+    forever, so a login burst degrades into fast failures rather than a stall.
+    """
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def start(self):
+        if self.executor is None and self.workers > 0:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # "spawn" avoids forking a process that already runs Motor's threads.
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.start()
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            result = await self._call(func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        # Only successful hashes count towards latency; cancelled calls count nowhere
+        self._record(time.perf_counter() - started, 1)
+        return result
+
+    async def map(self, func, items: list) -> list:
+        """
+        Run func over many items (e.g. bulk registration). At most `workers`
+        items are in the pool at a time so interactive logins are not stuck
+        behind a long batch, and batches are never rejected with 503.
+        """
+        self.start()
+        step = max(self.workers, 1)
+        results = []
+        for i in range(0, len(items), step):
+            chunk = items[i:i + step]
+            self.pending += len(chunk)
+            started = time.perf_counter()
+            try:
+                results.extend(await asyncio.gather(
+                    *[self._call(func, item) for item in chunk]
+                ))
+            except Exception:
+                self.failed += len(chunk)
+                raise
+            finally:
+                self.pending -= len(chunk)
+            self._record(time.perf_counter() - started, len(chunk))
+        return results
+
+    async def _call(self, func, *args):
+        """
+        Run one call in the pool. If a worker process died (OOM kill, crash in
+        the hashing backend) the executor is broken for good: replace it and
+        retry the call once.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenExecutor:
+                self._restart(executor)
+                if attempt:
+                    raise
+
+    def _restart(self, executor):
+        # Concurrent calls fail together; only the first one replaces the executor
+        if executor is not None and executor is self.executor:
+            logger.warning("Hashing pool broken (a worker process died); starting a new one")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.restarts += 1
+        self.start()
+
+    def _record(self, elapsed: float, count: int):
+        for _ in range(count):
+            metrics.observe_stage("hash", elapsed)
+        self.completed += count
+        self.total_seconds += elapsed * count
+        self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "avg_latency_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+            "max_latency_seconds": self.max_seconds,
+        }
+
+hash_pool = HashPool(HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING)
+user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+jwt_cache = TTLCache(JWT_CACHE_MAX_SIZE, ttl=0, max_bytes=JWT_CACHE_MAX_BYTES)
+refresh_store = token_store.create_refresh_token_store()
+metrics.registry.register_gauges("auth_hash_pool", hash_pool.stats)
+metrics.registry.register_gauges("auth_user_cache", user_cache.stats)
+metrics.registry.register_gauges("auth_jwt_cache", jwt_cache.stats)
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Non-blocking verify_password, executed in the hashing pool.
+    """
+    # Settings travel with each call so workers always hash with the current policy
+    return await hash_pool.run(_verify_with, password_settings, plain_password, hashed_password)
+
+async def hash_password_async(password):
+    """
+    Non-blocking get_password_hash, executed in the hashing pool.
+    """
+    return await hash_pool.run(_hash_with, password_settings, password)
+
+async def verify_password_or_dummy(plain_password, hashed_password):
+    """
+    verify_password_async that also accepts hashed_password=None (unknown
+    user). Unknown users are checked against a dummy hash, so a failed login
+    costs the same whether or not the username exists.
+    """
+    global _dummy_hash
+    if hashed_password is None:
+        if _dummy_hash is None:
+            _dummy_hash = await hash_password_async(uuid.uuid4().hex)
+        await verify_password_async(plain_password, _dummy_hash)
+        return False
+    return await verify_password_async(plain_password, hashed_password)
+
+async def hash_passwords_async(passwords: list) -> list:
+    """
+    Hash many passwords in parallel across the hashing pool.
+    """
+    return await hash_pool.map(functools.partial(_hash_with, password_settings), passwords)
+
+async def upgrade_password_hash(db, username: str, old_hash: str, password: str):
+    """
+    Re-hash a password with the current scheme and cost and store it.
+    Meant to run as a background task after a successful login; the update
+    only applies if the stored hash has not changed in the meantime.
+    """
+    try:
+        new_hash = await hash_password_async(password)
+    except HTTPException:
+        # Hashing pool saturated; try again on a later login
+        return
+    result = await db["users"].update_one(
+        {"username": username, "hashed_password": old_hash},
+        {"$set": {"hashed_password": new_hash}},
+    )
+    if result.modified_count:
+        invalidate_user(username)
+        logger.info("Upgraded password hash for user: %s", username)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -35,12 +344,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger = logging.getLogger(__name__)
-    logger.debug(f"Created access token for user: {data.get('sub')}")
+    to_encode.update({
+        "exp": expire,
+        "iat": datetime.now(timezone.utc),
+        "jti": uuid.uuid4().hex,
+    })
+    with metrics.stage("jwt"):
+        encoded_jwt = key_ring.encode(to_encode)
+    logger.debug("Created access token for user: %s", data.get("sub"))
     return encoded_jwt
 
+def access_token_claims(user: dict) -> dict:
+    """
+    Build the claims for an access token issued to the given user document.
+    In trusted claims mode the token also carries everything protected
+    routes need, so they can skip the database.
+    """
+    claims = {"sub": user["username"]}
+    if TRUSTED_CLAIMS:
+        claims.update({
+            "uid": str(user["_id"]),
+            "role": user.get("role", "role_user"),
+            "is_active": user.get("is_active", True),
+            "ver": user.get("token_version", 0),
+        })
+    return claims
+
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -49,23 +378,224 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with metrics.stage("jwt"):
+        encoded_jwt = key_ring.encode(to_encode)
     return encoded_jwt
 
-def verify_refresh_token(token: str):
+def decode_token(token: str) -> dict:
+    """
+    Verify a JWT and return its payload, memoizing the result until the
+    token expires so repeated bearer tokens skip signature verification.
+    Raises JWTError like jwt.decode.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = jwt_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
+    with metrics.stage("jwt"):
+        payload = key_ring.decode(token)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        # The raw token length is a fair upper bound for the decoded payload size
+        jwt_cache.set(key, payload, ttl=exp - time.time(), size=len(token) + len(key))
+    return dict(payload)
+
+def verify_refresh_token(token: str) -> dict:
+    """
+    Verify a refresh token and return its payload. Only rotating refresh
+    tokens (typ "refresh" with jti and family claims) are accepted.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate refresh token",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
+        payload = decode_token(token)
     except JWTError:
         raise credentials_exception
+    if payload.get("typ") != "refresh" or not all(payload.get(claim) for claim in ("sub", "jti", "fam")):
+        raise credentials_exception
+    return payload
+
+def _new_refresh_token(username: str, family: str) -> tuple:
+    """
+    Returns (jti, token, expires_at) for a new refresh token in `family`.
+    """
+    jti = uuid.uuid4().hex
+    expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    token = create_refresh_token(
+        data={"sub": username, "jti": jti, "fam": family, "typ": "refresh"},
+        expires_delta=expires_delta,
+    )
+    return jti, token, datetime.now(timezone.utc) + expires_delta
+
+async def issue_refresh_token(username: str, family: Optional[str] = None) -> str:
+    """
+    Create a refresh token and record it in the revocation store. Tokens from
+    one login share a family ID across rotations.
+    """
+    family = family or uuid.uuid4().hex
+    jti, token, expires_at = _new_refresh_token(username, family)
+    await refresh_store.add(jti, family, username, expires_at)
+    return token
+
+async def rotate_refresh_token(payload: dict, load_user: Callable[[], Awaitable[Optional[dict]]]) -> tuple:
+    """
+    Consume a refresh token and issue its successor in the same family.
+    Consuming, loading the user (load_user()) and recording the new token run
+    concurrently, so rotation costs a single round-trip. Returns (user, new
+    token), or (None, None) if the user no longer exists.
+
+    If anything fails after the old token was consumed, the consume is undone:
+    the client can retry with the same token instead of tripping reuse
+    detection and losing its whole token family.
+    """
+    username, family = payload["sub"], payload["fam"]
+    jti, token, expires_at = _new_refresh_token(username, family)
+    consumed, user, added = await asyncio.gather(
+        consume_refresh_token(payload),
+        load_user(),
+        refresh_store.add(jti, family, username, expires_at),
+        return_exceptions=True,
+    )
+    errors = [result for result in (consumed, user, added) if isinstance(result, BaseException)]
+    if not errors and user is not None:
+        return user, token
+    try:
+        # The new token is never handed out
+        if not isinstance(added, BaseException):
+            await refresh_store.discard(jti)
+        if errors and not isinstance(consumed, BaseException):
+            await refresh_store.restore(payload["jti"])
+    except Exception as e:
+        logger.warning("Could not roll back refresh token rotation for user %s: %s", username, e)
+    if errors:
+        # A rejected token (401) takes precedence over other failures
+        raise next((e for e in errors if isinstance(e, HTTPException)), errors[0])
+    return None, None
+
+async def consume_refresh_token(payload: dict):
+    """
+    Mark a refresh token as used. Presenting an already used token means it
+    leaked, so its whole family is revoked and the request rejected.
+    """
+    result = await refresh_store.consume(payload["jti"])
+    if result == token_store.CONSUMED:
+        return
+    if result == token_store.REUSED:
+        logger.warning("Refresh token reuse detected for user %s, revoking token family", payload["sub"])
+        await refresh_store.revoke_family(payload["fam"])
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+# --- TOKEN REVOCATION ---
+
+class TokenRevocations:
+    """
+    Per-user revocations checked by trusted claims tokens, shared between
+    workers through the "token_revocations" collection. All tokens of a user
+    are revoked by raising the minimum accepted user version ("ver"). Each
+    worker keeps a copy in memory and reloads it at most every
+    refresh_seconds, so checks cost no query per request and a revocation
+    reaches every worker within that interval. Entries expire (TTL index)
+    once the tokens they reject have expired anyway.
+    """
+    collection_name = "token_revocations"
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        # username -> (min_version, expiry timestamp)
+        self.min_versions: dict = {}
+        self.loaded_at = float("-inf")
+        self._loading = None
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index("expires_at", expireAfterSeconds=0)
+
+    async def revoke_user(self, username: str, min_version: int):
+        # Tokens issued before the change are gone after one access token lifetime
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        db = database.db_manager.db
+        if db is not None:
+            await db[self.collection_name].update_one(
+                {"_id": username},
+                {"$set": {"expires_at": expires_at}, "$max": {"min_version": min_version}},
+                upsert=True,
+            )
+        self._merge(username, min_version, expires_at.timestamp())
+
+    async def refresh(self):
+        """
+        Reload the shared state if it is older than refresh_seconds.
+        Concurrent callers share one query.
+        """
+        if time.monotonic() - self.loaded_at < self.refresh_seconds:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._loading)
+
+    def is_revoked(self, payload: dict) -> bool:
+        min_version, expires_at = self.min_versions.get(payload.get("sub"), (0, 0.0))
+        return expires_at > time.time() and payload.get("ver", 0) < min_version
+
+    def _merge(self, username: str, min_version: int, expires_at: float):
+        current = self.min_versions.get(username)
+        if current is None or min_version >= current[0]:
+            self.min_versions[username] = (min_version, expires_at)
+
+    async def _load(self):
+        try:
+            db = database.db_manager.db
+            if db is None:
+                return
+            documents = await db[self.collection_name].find().to_list(None)
+            now = time.time()
+            # Keep local entries that are still live: a revocation made here may
+            # not be visible to a query that started before it was written
+            self.min_versions = {user: entry for user, entry in self.min_versions.items() if entry[1] > now}
+            for document in documents:
+                expires_at = document["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+                self._merge(document["_id"], document["min_version"], expires_at)
+        except Exception as e:
+            # Keep the previous state and retry after the next interval
+            logger.warning("Could not reload token revocations: %s", e)
+        finally:
+            self.loaded_at = time.monotonic()
+            self._loading = None
+
+revocations = TokenRevocations(TOKEN_REVOCATION_REFRESH_SECONDS)
+
+async def revoke_user_tokens(db, username: str) -> Optional[int]:
+    """
+    Revoke every token of a user: increment their token_version, reject
+    access tokens carrying an older "ver" on every worker, and drop their
+    refresh tokens. Returns the new version, or None if the user is unknown.
+    """
+    user = await db["users"].find_one_and_update(
+        {"username": username},
+        {"$inc": {"token_version": 1}},
+        projection={"_id": 0, "token_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if user is None:
+        return None
+    await revocations.revoke_user(username, user["token_version"])
+    await refresh_store.revoke_user(username)
+    invalidate_user(username)
+    return user["token_version"]
+
+def invalidate_user(username: str):
+    """
+    Drop a cached user. Call this whenever a user document is created or
+    changed (e.g. role or is_active updates) so the change is seen immediately.
+    """
+    user_cache.invalidate(username)
 
 # --- DEPENDENCIES ---
 
@@ -78,23 +608,70 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(dat
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    logger = logging.getLogger(__name__)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
-        if username is None:
-            logger.warning("Token validation failed: No username in payload")
+        if username is None or payload.get("typ") == "refresh":
+            logger.warning("Token validation failed: No username in payload or not an access token")
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
     except JWTError as e:
-        logger.warning(f"Token validation failed: {str(e)}")
+        logger.warning("Token validation failed: %s", e)
         raise credentials_exception
     
-    # Async MongoDB call
-    user = await db["users"].find_one({"username": token_data.username})
+    # Served from the user cache; concurrent misses share one MongoDB query
+    user = await user_cache.get_or_load(
+        token_data.username,
+        lambda: database.find_user_for_auth(db, token_data.username),
+    )
     
     if user is None:
         raise credentials_exception
     
     # Convert raw Mongo dict to a Schema for consistent typing, though returning dict works too
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_user_from_claims(token: str = Depends(oauth2_scheme)):
+    """
+    Async dependency that rebuilds the user from trusted access token claims
+    without touching MongoDB.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(token)
+    except JWTError as e:
+        logger.warning("Token validation failed: %s", e)
+        raise credentials_exception
+
+    if payload.get("sub") is None or payload.get("role") is None or payload.get("typ") == "refresh":
+        logger.warning("Token validation failed: Token does not carry trusted claims")
+        raise credentials_exception
+    await revocations.refresh()
+    if not payload.get("is_active", False) or revocations.is_revoked(payload):
+        logger.warning("Token validation failed: Token revoked for user %s", payload["sub"])
+        raise credentials_exception
+
+    return {
+        "_id": payload.get("uid"),
+        "username": payload["sub"],
+        "role": payload["role"],
+        "is_active": payload["is_active"],
+    }
+
+# Dependency used by protected routes, chosen by the TRUSTED_CLAIMS setting
+require_user = get_current_user_from_claims if TRUSTED_CLAIMS else get_current_user
+
+async def require_admin(current_user: dict = Depends(require_user)):
+    """
+    Async dependency that only lets administrators through.
+    """
+    if current_user.get("role") != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator role required",
+        )
+    return current_user
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Load test for the auth endpoints, run in-process against an in-memory
+MongoDB stand-in (mongomock-motor) through httpx's ASGI transport, so results
+are reproducible and do not depend on network or Atlas latency.
+
+Reports p50/p95/p99 latency and requests/sec per endpoint as JSON.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_endpoints.py --concurrency 16 --requests 500 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Allow running from the repository root or from benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark_secret")
+os.environ.setdefault("DB_NAME", "benchmark")
+# Every simulated client shares one IP and logs in repeatedly; lift login throttling
+os.environ.setdefault("LOGIN_ATTEMPTS_PER_MINUTE_USER", "1000000")
+os.environ.setdefault("LOGIN_ATTEMPTS_PER_MINUTE_IP", "1000000")
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+import auth
+import database
+import main
+
+ENDPOINTS = ["token", "refresh", "users_me", "register"]
+PASSWORD = "benchmark-password"
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def setup_database():
+    client = AsyncMongoMockClient()
+    database.db_manager.client = client
+    database.db_manager.db = client[database.DB_NAME]
+    await database.db_manager.db["users"].create_index("username", unique=True)
+
+
+async def login(client, username):
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()
+
+
+class Worker:
+    """
+    One simulated client. Keeps its own tokens so refresh tokens can be
+    chained (they may be single-use when rotation is enabled).
+    """
+    def __init__(self, client, worker_id):
+        self.client = client
+        self.username = f"bench-node-{worker_id}"
+        self.tokens = None
+        self.registered = 0
+        self.worker_id = worker_id
+
+    async def prepare(self):
+        await self.client.post("/register", json={"username": self.username, "password": PASSWORD})
+        self.tokens = await login(self.client, self.username)
+
+    async def call(self, endpoint):
+        if endpoint == "token":
+            return await self.client.post("/token", data={"username": self.username, "password": PASSWORD})
+        if endpoint == "refresh":
+            response = await self.client.post(
+                "/refresh", headers={"Authorization": f"Bearer {self.tokens['refresh_token']}"}
+            )
+            if response.status_code == 200:
+                self.tokens = response.json()
+            return response
+        if endpoint == "users_me":
+            return await self.client.get(
+                "/users/me", headers={"Authorization": f"Bearer {self.tokens['access_token']}"}
+            )
+        if endpoint == "register":
+            self.registered += 1
+            username = f"bench-new-{self.worker_id}-{self.registered}-{time.monotonic_ns()}"
+            return await self.client.post("/register", json={"username": username, "password": PASSWORD})
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def run_endpoint(workers, endpoint, total_requests):
+    latencies = []
+    errors = 0
+    remaining = total_requests
+
+    async def loop(worker):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await worker.call(endpoint)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[loop(worker) for worker in workers])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def run(args):
+    await setup_database()
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        workers = [Worker(client, i) for i in range(args.concurrency)]
+        for worker in workers:
+            await worker.prepare()
+        for endpoint in args.endpoints:
+            # Short warm-up so one-off costs (worker spawn, caches) are excluded
+            await run_endpoint(workers, endpoint, min(args.concurrency, args.requests))
+            results[endpoint] = await run_endpoint(workers, endpoint, args.requests)
+            print(f"{endpoint:>10}: {results[endpoint]}", file=sys.stderr)
+    auth.hash_pool.shutdown()
+    return {
+        "app_version": main.app.version,
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "requests_per_endpoint": args.requests,
+        "hash_pool_workers": auth.HASH_POOL_WORKERS,
+        "results": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="In-process load test for the auth endpoints.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,42 @@
+"""
+Micro-benchmark: cost of validating the same bearer token repeatedly,
+with a plain signature check versus the memoized auth.decode_token.
+Uses the configured JWT_ALGORITHM (HS256 unless set).
+
+Usage: python benchmarks/bench_jwt_decode.py [iterations]
+"""
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+# Allow running from the repository root or from benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark_secret")
+
+import auth
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token = auth.create_access_token(
+        {"sub": "node-0001", "role": "role_user", "is_active": True},
+        expires_delta=timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+    uncached = timeit.timeit(
+        lambda: auth.key_ring.decode(token),
+        number=iterations,
+    )
+    auth.jwt_cache.clear()
+    cached = timeit.timeit(lambda: auth.decode_token(token), number=iterations)
+
+    print(f"iterations:        {iterations}")
+    print(f"{auth.ALGORITHM + ' verify:':<19}{uncached / iterations * 1e6:8.2f} us/op")
+    print(f"auth.decode_token: {cached / iterations * 1e6:8.2f} us/op")
+    print(f"speedup:           {uncached / cached:8.1f}x")
+    print(f"cache stats:       {auth.jwt_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Logging overhead on /token and /refresh: handlers called synchronously on
+the event loop ("direct", the previous setup) versus the QueueHandler /
+QueueListener pipeline installed by logging_config.setup_logging ("queue").
+Log output goes to --log-file; --write-delay-ms simulates a console or log
+collector that blocks on each write (e.g. a full pipe under load).
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_logging.py --concurrency 16 --requests 500 --write-delay-ms 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+# Allow running from the repository root or from benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Queue every login instead of shedding load, so each mode serves the same work
+os.environ.setdefault("HASH_POOL_MAX_PENDING", "1000000")
+# Refresh token state in a dict, so rounds do not slow down as the in-memory
+# MongoDB collection grows
+os.environ.setdefault("REFRESH_TOKEN_STORE", "memory")
+
+import bench_endpoints  # sets the benchmark environment before the app is imported
+import httpx
+
+import auth
+import logging_config
+import main
+
+ENDPOINTS = ["token", "refresh"]
+MODES = ["direct", "queue"]
+
+# Only the application's own records are measured, not the benchmark client's
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class SlowStream:
+    """
+    File wrapper whose writes block for a fixed time.
+    """
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def configure(mode, stream):
+    logging_config.stop_logging()
+    root = logging.getLogger()
+    root.handlers = []
+    if mode == "queue":
+        logging_config.setup_logging(stream)
+        return
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(logging_config.TEXT_FORMAT))
+    logging_config.mongo_handler.setFormatter(logging.Formatter(logging_config.TEXT_FORMAT))
+    root.setLevel(logging_config.LOG_LEVEL)
+    root.handlers = [handler, logging_config.mongo_handler]
+
+
+async def run(args, stream):
+    await bench_endpoints.setup_database()
+    await logging_config.mongo_handler.start()
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        workers = [bench_endpoints.Worker(client, i) for i in range(args.concurrency)]
+        for worker in workers:
+            await worker.prepare()
+        # Modes alternate, first one then the other going first, so warm-up and
+        # drift affect both equally
+        for endpoint in ENDPOINTS:
+            for round_number in range(args.rounds):
+                for mode in (MODES if round_number % 2 == 0 else MODES[::-1]):
+                    configure(mode, stream)
+                    await bench_endpoints.run_endpoint(workers, endpoint, min(args.concurrency, args.requests))
+                    result = await bench_endpoints.run_endpoint(workers, endpoint, args.requests)
+                    results.setdefault(mode, {}).setdefault(endpoint, []).append(result)
+                    print(f"{mode:>6} {endpoint:>8} #{round_number + 1}: {result}", file=sys.stderr)
+    logging_config.stop_logging()
+    await logging_config.mongo_handler.stop()
+    auth.hash_pool.shutdown()
+    summary = {
+        mode: {
+            endpoint: round(statistics.median(result["requests_per_second"] for result in rounds), 2)
+            for endpoint, rounds in endpoints.items()
+        }
+        for mode, endpoints in results.items()
+    }
+    return {
+        "concurrency": args.concurrency,
+        "requests_per_endpoint": args.requests,
+        "log_format": logging_config.LOG_FORMAT,
+        "write_delay_ms": args.write_delay_ms,
+        "rounds": args.rounds,
+        "median_requests_per_second": summary,
+        "requests_per_second_gain": {
+            endpoint: round(summary["queue"][endpoint] / summary["direct"][endpoint], 3) for endpoint in ENDPOINTS
+        },
+        "results": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare synchronous and queued logging on /token and /refresh.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and mode")
+    parser.add_argument("--rounds", type=int, default=4, help="Alternating rounds per mode")
+    parser.add_argument("--log-file", default=os.devnull, help="Where log output is written (default: discarded)")
+    parser.add_argument("--write-delay-ms", type=float, default=0.0, help="Simulated blocking time per log write")
+    args = parser.parse_args()
+
+    with open(args.log_file, "a") as stream:
+        if args.write_delay_ms:
+            stream = SlowStream(stream, args.write_delay_ms / 1000)
+        report = asyncio.run(run(args, stream))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,137 @@
+"""
+Worker startup time, measured in fresh interpreters: how long `import main`
+takes, how long the lifespan takes until the worker serves (/healthz), and
+how long until background startup work finishes (/readyz). MongoDB is the
+in-memory mongomock-motor stand-in; --index-delay-ms adds latency to every
+createIndex call, as on a remote cluster. Only the unique username index
+delays serving; --skip-index-creation starts like a serve.py worker, which
+builds none.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_startup.py --runs 10 --index-delay-ms 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow running from the repository root or from benchmarks/
+sys.path.insert(0, ROOT)
+
+CHILD_ENV = {
+    "SECRET_KEY": "benchmark_secret",
+    "DB_NAME": "benchmark",
+    # Keep the child's stdout for the result line
+    "LOG_LEVEL": "WARNING",
+}
+
+
+async def measure_lifespan(main, index_delay: float) -> dict:
+    import database
+    import mongomock_motor
+    from health import readiness
+
+    database.create_client = mongomock_motor.AsyncMongoMockClient
+    create_index = mongomock_motor.AsyncMongoMockCollection.create_index
+
+    async def slow_create_index(collection, *args, **kwargs):
+        await asyncio.sleep(index_delay)
+        return await create_index(collection, *args, **kwargs)
+
+    mongomock_motor.AsyncMongoMockCollection.create_index = slow_create_index
+
+    started = time.perf_counter()
+    async with main.lifespan(main.app):
+        serving = time.perf_counter() - started
+        while not readiness.startup_complete:
+            await asyncio.sleep(0.001)
+        ready = time.perf_counter() - started
+    return {"serving_ms": serving * 1000, "ready_ms": ready * 1000}
+
+
+def run_child(index_delay: float):
+    """
+    One measurement, run in a fresh interpreter so nothing is imported yet.
+    """
+    started = time.perf_counter()
+    import main
+    result = {"import_ms": (time.perf_counter() - started) * 1000}
+    result.update(asyncio.run(measure_lifespan(main, index_delay)))
+    print(json.dumps(result))
+
+
+def spawn(args, *flags) -> subprocess.CompletedProcess:
+    env = {**os.environ, **CHILD_ENV}
+    if args.skip_index_creation:
+        env["SKIP_INDEX_CREATION"] = "true"
+    return subprocess.run(
+        [sys.executable, *flags, os.path.abspath(__file__), "--child", "--index-delay-ms", str(args.index_delay_ms)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def slowest_imports(args) -> list:
+    """
+    Direct imports of main with the largest cumulative import time, from
+    -X importtime (which lists a module's imports just before the module).
+    """
+    process = spawn(args, "-X", "importtime")
+    children = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # " " after the bar, then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == "main":
+                break
+            children = []
+    children.sort(key=lambda child: child[1], reverse=True)
+    return [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in children[:args.top]]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure worker import, serving and readiness times.")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to measure")
+    parser.add_argument("--index-delay-ms", type=float, default=0.0, help="Simulated latency of each createIndex call")
+    parser.add_argument("--skip-index-creation", action="store_true",
+                        help="Start like a serve.py worker, without building indexes")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.index_delay_ms / 1000)
+        return
+
+    runs = []
+    for run_number in range(args.runs):
+        result = json.loads(spawn(args).stdout.strip().splitlines()[-1])
+        runs.append(result)
+        print(f"run #{run_number + 1}: {result}", file=sys.stderr)
+    report = {
+        "runs": args.runs,
+        "index_delay_ms": args.index_delay_ms,
+        "skip_index_creation": args.skip_index_creation,
+        "median_ms": {
+            key: round(statistics.median(run[key] for run in runs), 1)
+            for key in ("import_ms", "serving_ms", "ready_ms")
+        },
+        "slowest_imports": slowest_imports(args),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
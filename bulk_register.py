@@ -0,0 +1,78 @@
+import argparse
+import csv
+import json
+import sys
+import requests
+
+# Ensure this matches the running port
+AUTH_SERVICE_URL = "http://localhost:8002"
+
+def read_entries(path):
+    """
+    Yield {"username", "password"} dicts from an NDJSON file or a CSV file
+    with "username,password" columns, one line at a time.
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {"username": row["username"], "password": row["password"]}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def get_admin_token(base_url, username, password):
+    response = requests.post(f"{base_url}/token", data={"username": username, "password": password})
+    if response.status_code != 200:
+        print(f"Login failed: {response.status_code} {response.text}")
+        sys.exit(1)
+    return response.json()["access_token"]
+
+def bulk_register(base_url, token, path, output=None):
+    """
+    Stream the entries in `path` to /register/bulk and stream the per-entry
+    results back, so neither side holds the whole batch in memory.
+    """
+    def body():
+        for entry in read_entries(path):
+            yield (json.dumps(entry) + "\n").encode()
+
+    response = requests.post(
+        f"{base_url}/register/bulk",
+        data=body(),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+        stream=True,
+    )
+    if response.status_code != 200:
+        print(f"Bulk registration failed: {response.status_code} {response.text}")
+        sys.exit(1)
+
+    counts = {}
+    out = open(output, "w") if output else None
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if out:
+                out.write(line.decode() + "\n")
+            elif result["status"] != "created":
+                print(f"- entry {result['index']} ({result.get('username')}): {result['status']}")
+    finally:
+        if out:
+            out.close()
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Register many compute nodes through /register/bulk.")
+    parser.add_argument("file", help="NDJSON file (one {\"username\", \"password\"} per line) or CSV with username,password columns")
+    parser.add_argument("--url", default=AUTH_SERVICE_URL, help="Base URL of the auth service")
+    parser.add_argument("--admin-user", required=True, help="Administrator username")
+    parser.add_argument("--admin-password", required=True, help="Administrator password")
+    parser.add_argument("--output", help="Write every per-entry result to this NDJSON file")
+    args = parser.parse_args()
+
+    token = get_admin_token(args.url, args.admin_user, args.admin_password)
+    counts = bulk_register(args.url, token, args.file, args.output)
+    print(f"Done: {counts}")
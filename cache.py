@@ -0,0 +1,136 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry and LRU eviction.
+    Besides the entry count, the cache can be capped by an approximate memory
+    budget (max_bytes) using sizes supplied by the caller on set().
+    All operations are synchronous and never await, so they are safe to call
+    from coroutines running on the same event loop without extra locking.
+    """
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0):
+        if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        self.pop(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class UserCache:
+    """
+    Cache of user documents keyed by username.
+    Concurrent misses for the same username share a single database query
+    (single-flight), and invalidate() must be called whenever a user changes.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        self._inflight: dict = {}
+        # Bumped by invalidate() so a load that raced with a change is not cached
+        self._epoch = 0
+
+    async def get_or_load(self, username: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        user = self._cache.get(username)
+        if user is not None:
+            return user
+
+        future = self._inflight.get(username)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leading request was cancelled (e.g. its client went away),
+                # not this one: load again instead of failing an unrelated request
+                if not future.cancelled():
+                    raise
+                return await self.get_or_load(username, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[username] = future
+        epoch = self._epoch
+        try:
+            user = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            # Missing users are not cached so a fresh registration is visible immediately
+            if user is not None and epoch == self._epoch:
+                self._cache.set(username, user)
+            future.set_result(user)
+            return user
+        finally:
+            if self._inflight.get(username) is future:
+                del self._inflight[username]
+
+    def invalidate(self, username: str):
+        self._epoch += 1
+        self._cache.pop(username)
+        self._inflight.pop(username, None)
+
+    def clear(self):
+        self._epoch += 1
+        self._cache.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "inflight": len(self._inflight)}
@@ -1,31 +1,144 @@
+import argparse
 import asyncio
 import database
-from motor.motor_asyncio import AsyncIOMotorClient
-import certifi
-import os
+import re
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
 
 load_dotenv()
 
-async def check_logs():
-    print("Connecting to MongoDB...")
-    client = AsyncIOMotorClient(
-        os.getenv("MONGODB_URI"),
-        tls=True,
-        tlsCAFile=certifi.where()
-    )
-    db = client[os.getenv("DB_NAME")]
-    
-    print("Checking logs collection...")
-    count = await db["logs"].count_documents({})
-    print(f"Total logs found: {count}")
-    
-    if count > 0:
-        print("Latest 5 logs:")
-        async for log in db["logs"].find().sort("timestamp", -1).limit(5):
-            print(f"- {log['timestamp']} [{log['level']}] {log['message']}")
-    else:
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+RELATIVE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+PROJECTION = {"_id": 1, "timestamp": 1, "level": 1, "logger": 1, "message": 1}
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Accept an ISO 8601 timestamp (UTC unless it has an offset) or a relative
+    age such as "15m", "2h" or "7d".
+    """
+    match = re.fullmatch(r"(\d+)([smhd])", value)
+    if match:
+        return datetime.now(timezone.utc) - timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def build_filter(args) -> dict:
+    query = {}
+    if args.level:
+        # --level WARNING shows WARNING and everything more severe
+        query["level"] = {"$in": LEVELS[LEVELS.index(args.level):]}
+    if args.logger:
+        # Anchored prefix, so "uvicorn" also matches "uvicorn.error"
+        query["logger"] = {"$regex": "^" + re.escape(args.logger)}
+    if args.since or args.until:
+        query["timestamp"] = {}
+        if args.since:
+            query["timestamp"]["$gte"] = args.since
+        if args.until:
+            query["timestamp"]["$lt"] = args.until
+    return query
+
+
+def print_log(log):
+    print(f"- {log['timestamp']} [{log['level']}] {log.get('logger', '-')}: {log['message']}")
+
+
+async def show_logs(logs, query, args):
+    """
+    With --since, stream the whole range oldest first in batches of
+    --batch-size; otherwise show the latest --limit records.
+    """
+    if args.since:
+        cursor = logs.find(query, PROJECTION).sort("timestamp", 1).batch_size(args.batch_size)
+        if args.limit:
+            cursor = cursor.limit(args.limit)
+        async for log in cursor:
+            print_log(log)
+        return
+
+    limit = 5 if args.limit is None else args.limit
+    latest = await logs.find(query, PROJECTION).sort("timestamp", -1).limit(limit).to_list(None)
+    if not latest:
         print("No logs found.")
+    for log in reversed(latest):
+        print_log(log)
+
+
+async def follow_change_stream(logs, query):
+    pipeline = [{"$match": {"operationType": "insert", **{f"fullDocument.{k}": v for k, v in query.items()}}}]
+    async with logs.watch(pipeline) as stream:
+        async for change in stream:
+            print_log(change["fullDocument"])
+
+
+async def follow_polling(logs, query, interval: float):
+    """
+    Tailing fallback for deployments without change streams (standalone
+    servers): poll for records at or after the newest timestamp seen.
+    """
+    last = datetime.now(timezone.utc)
+    seen = set()
+    while True:
+        cursor = logs.find({**query, "timestamp": {"$gte": last}}, PROJECTION).sort("timestamp", 1)
+        async for log in cursor:
+            if log["_id"] in seen:
+                continue
+            timestamp = log["timestamp"].replace(tzinfo=timezone.utc)
+            if timestamp > last:
+                last, seen = timestamp, set()
+            seen.add(log["_id"])
+            print_log(log)
+        await asyncio.sleep(interval)
+
+
+async def follow(logs, query, interval: float):
+    # Only new records are followed, so the time range does not apply
+    query = {key: value for key, value in query.items() if key != "timestamp"}
+    try:
+        await follow_change_stream(logs, query)
+    except OperationFailure as exc:
+        # 40573: change streams need a replica set (Atlas always has one)
+        if exc.code != 40573:
+            raise
+        print("Change streams unavailable, polling for new logs...")
+        await follow_polling(logs, query, interval)
+
+
+async def check_logs(args):
+    print("Connecting to MongoDB...")
+    db = database.connect()
+    logs = db["logs"]
+    try:
+        # From collection metadata: no scan, unlike count_documents({})
+        count = await logs.estimated_document_count()
+        print(f"Total logs found (estimated): {count}")
+
+        query = build_filter(args)
+        await show_logs(logs, query, args)
+        if args.follow:
+            await follow(logs, query, args.poll_interval)
+    finally:
+        database.close()
+
 
 if __name__ == "__main__":
-    asyncio.run(check_logs())
+    parser = argparse.ArgumentParser(description="Query the application logs stored in MongoDB.")
+    parser.add_argument("--since", type=parse_time, help='Start time: ISO 8601 or relative ("15m", "2h", "7d")')
+    parser.add_argument("--until", type=parse_time, help="End time (exclusive), same formats as --since")
+    parser.add_argument("--level", type=str.upper, choices=LEVELS, help="Minimum level")
+    parser.add_argument("--logger", help="Logger name prefix, e.g. uvicorn")
+    parser.add_argument("--limit", type=int,
+                        help="Records to show (default: the latest 5, or the whole range with --since)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Cursor batch size when streaming a range")
+    parser.add_argument("--follow", "-f", action="store_true", help="Keep printing new logs as they are written")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between polls when change streams are unavailable")
+    try:
+        asyncio.run(check_logs(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
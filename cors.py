@@ -0,0 +1,44 @@
+import os
+from starlette.middleware.cors import CORSMiddleware
+import metrics
+
+# --- CONFIGURATION ---
+# Comma-separated origins allowed to call the API from a browser, e.g.
+# "https://admin.example.com,http://localhost:3000". The bundled index.html is
+# served from the API's own origin and needs no entry. "*" allows any origin
+# (development only: credentials are allowed too).
+CORS_ALLOW_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "").split(",") if origin.strip()]
+# Optional regex for origins that cannot be listed, e.g. "https://.*\.example\.com"
+CORS_ALLOW_ORIGIN_REGEX = os.getenv("CORS_ALLOW_ORIGIN_REGEX") or None
+# How long browsers may cache a preflight result. Browsers cap it (Firefox at
+# 24h, Chromium at 2h), so the largest useful value is the default.
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", 86400))
+
+cors_preflights = metrics.registry.register(metrics.Counter(
+    "http_cors_preflight_total", "CORS preflight requests answered by the CORS middleware.", ("outcome",)))
+cors_requests = metrics.registry.register(metrics.Counter(
+    "http_cors_requests_total", "Cross-origin (non-preflight) requests, by whether the origin is allowed.", ("allowed",)))
+
+
+class CountingCORSMiddleware(CORSMiddleware):
+    """
+    Starlette's CORSMiddleware with the allowlist in a frozenset (one hash
+    lookup per request) and counters for preflight and cross-origin traffic.
+    Installed as the outermost middleware, so preflights are answered before
+    any other middleware, dependency or database work runs.
+    """
+    def __init__(self, app, allow_origins=(), **kwargs):
+        super().__init__(app, allow_origins=allow_origins, **kwargs)
+        self.allow_origins = frozenset(allow_origins)
+
+    def preflight_response(self, request_headers):
+        response = super().preflight_response(request_headers)
+        if metrics.METRICS_ENABLED:
+            cors_preflights.inc("allowed" if response.status_code == 200 else "rejected")
+        return response
+
+    async def simple_response(self, scope, receive, send, request_headers):
+        origin = request_headers.get("origin")
+        if origin is not None and metrics.METRICS_ENABLED:
+            cors_requests.inc("true" if self.is_allowed_origin(origin) else "false")
+        await super().simple_response(scope, receive, send, request_headers)
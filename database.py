@@ -1,8 +1,10 @@
 import os
+import asyncio
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
-import certifi
 import logging
+import metrics
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -14,12 +16,75 @@ load_dotenv()
 MONGO_URL = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
 
+# Connection pool settings (see the PyMongo/Motor MongoClient options)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = os.getenv("MONGO_MAX_IDLE_TIME_MS")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+# Wire compression, e.g. "zstd,snappy" (needs the zstandard / python-snappy packages)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS")
+
+logger = logging.getLogger(__name__)
+
 class Database:
     client: AsyncIOMotorClient = None
     db = None
 
 db_manager = Database()
 
+def create_client() -> AsyncIOMotorClient:
+    """
+    Build a Motor client with the configured pool settings.
+    This is the only place a client should be constructed.
+    """
+    import certifi  # only needed once a client is built, not for imports by tools
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if MONGO_MAX_IDLE_TIME_MS:
+        options["maxIdleTimeMS"] = int(MONGO_MAX_IDLE_TIME_MS)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    if metrics.METRICS_ENABLED:
+        options["event_listeners"] = [metrics.MongoCommandMetrics()]
+    return AsyncIOMotorClient(
+        MONGO_URL,
+        tls=True,
+        tlsCAFile=certifi.where(),
+        **options
+    )
+
+def connect():
+    """
+    Create the shared client on first use and return the database object.
+    """
+    if db_manager.db is None:
+        db_manager.client = create_client()
+        db_manager.db = db_manager.client[DB_NAME]
+    return db_manager.db
+
+async def warm_up():
+    """
+    Ping the server and pre-open MONGO_MIN_POOL_SIZE connections, so the
+    first requests after a deploy do not pay for TLS handshakes.
+    """
+    admin = db_manager.client.admin
+    await admin.command("ping")
+    if MONGO_MIN_POOL_SIZE > 1:
+        # Concurrent commands force the pool to open that many connections
+        await asyncio.gather(*[admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)])
+
+def close():
+    if db_manager.client:
+        db_manager.client.close()
+    db_manager.client = None
+    db_manager.db = None
+
 async def get_db():
     """
     Dependency that returns the database object.
@@ -27,13 +92,88 @@ async def get_db():
     to open/close connections per request like we do with SQL sessions.
     """
     if db_manager.db is None:
-        logger = logging.getLogger(__name__)
         logger.info("Initializing MongoDB connection...")
         # Lazy initialization if needed, though main.py usually handles startup
-        db_manager.client = AsyncIOMotorClient(
-            MONGO_URL,
-            tls=True,
-            tlsCAFile=certifi.where()
-        )
-        db_manager.db = db_manager.client[DB_NAME]
+        connect()
     return db_manager.db
+
+# --- USER QUERIES ---
+# Purpose-specific lookups that only fetch the fields each caller needs.
+# Inactive users are treated as missing everywhere.
+
+# Compound index covering username lookups that only need these fields,
+# so MongoDB can answer them from the index without reading documents.
+USER_AUTH_INDEX = [("username", 1), ("role", 1), ("is_active", 1), ("_id", 1)]
+USER_AUTH_PROJECTION = {"_id": 1, "username": 1, "role": 1, "is_active": 1}
+
+# Admin listing (/users): keyset pages in username order, filtered by role
+# and/or is_active. Each filter combination has an index with the filtered
+# fields first and username last, so pages are index range scans.
+USER_LIST_INDEXES = {
+    "role_active_username": [("role", 1), ("is_active", 1), ("username", 1)],
+    "active_username": [("is_active", 1), ("username", 1)],
+}
+
+async def ensure_username_index(db):
+    # Create unique index for username to ensure no duplicates
+    await db["users"].create_index("username", unique=True)
+
+async def ensure_user_indexes(db):
+    await asyncio.gather(
+        ensure_username_index(db),
+        db["users"].create_index(USER_AUTH_INDEX, name="username_role_active"),
+        *[db["users"].create_index(keys, name=name) for name, keys in USER_LIST_INDEXES.items()],
+    )
+
+async def find_user_for_auth(db, username: str):
+    """
+    Fields needed to authenticate a request (UserResponse); covered by USER_AUTH_INDEX.
+    """
+    return await db["users"].find_one({"username": username, "is_active": True}, USER_AUTH_PROJECTION)
+
+async def find_user_for_login(db, username: str):
+    """
+    Fields needed to check a password and issue tokens.
+    """
+    return await db["users"].find_one(
+        {"username": username, "is_active": True},
+        {**USER_AUTH_PROJECTION, "hashed_password": 1, "token_version": 1},
+    )
+
+async def find_user_for_refresh(db, username: str, with_claims: bool = False):
+    """
+    Existence check for /refresh (covered by USER_AUTH_INDEX), or the fields
+    needed for trusted claims when with_claims is set.
+    """
+    projection = {**USER_AUTH_PROJECTION, "token_version": 1} if with_claims else {"_id": 1}
+    return await db["users"].find_one({"username": username, "is_active": True}, projection)
+
+def _user_list_filter(role: Optional[str], is_active: Optional[bool], after: Optional[str]) -> dict:
+    query = {}
+    if role is not None:
+        query["role"] = role
+        # Both values spelled out, so role_active_username can return a
+        # username-sorted merge instead of an in-memory sort
+        query["is_active"] = {"$in": [True, False]}
+    if is_active is not None:
+        query["is_active"] = is_active
+    if after is not None:
+        query["username"] = {"$gt": after}
+    return query
+
+async def list_users(db, limit: int, after: Optional[str] = None, role: Optional[str] = None,
+                     is_active: Optional[bool] = None) -> list:
+    """
+    One page of users in username order, starting after the username `after`
+    (keyset pagination: no skip, so every page costs the same). Never
+    includes password hashes.
+    """
+    cursor = db["users"].find(_user_list_filter(role, is_active, after), USER_AUTH_PROJECTION)
+    return await cursor.sort("username", 1).limit(limit).to_list(limit)
+
+def iter_users(db, role: Optional[str] = None, is_active: Optional[bool] = None, batch_size: int = 1000):
+    """
+    Cursor over every matching user in username order, fetched in batches.
+    """
+    cursor = db["users"].find(_user_list_filter(role, is_active, None), USER_AUTH_PROJECTION)
+    return cursor.sort("username", 1).batch_size(batch_size)
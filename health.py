@@ -0,0 +1,55 @@
+import os
+import time
+import asyncio
+import database
+
+# --- CONFIGURATION ---
+# /readyz pings MongoDB at most once per READINESS_CACHE_SECONDS, however
+# often it is probed; a ping slower than READINESS_TIMEOUT_SECONDS fails.
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", 5))
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", 2))
+
+
+class ReadinessProbe:
+    """
+    Readiness of this worker: background startup work has finished and
+    MongoDB answers a ping. The ping result is cached for cache_seconds and
+    concurrent probes share a single ping.
+    """
+    def __init__(self, cache_seconds: float = READINESS_CACHE_SECONDS, timeout: float = READINESS_TIMEOUT_SECONDS):
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        # Set by main.py once the pool warm-up, index builds and the scheduler are done
+        self.startup_complete = False
+        self.mongo_ok = False
+        self.mongo_error = "not checked yet"
+        self.checked_at = float("-inf")
+        self._ping = None
+
+    async def check(self) -> dict:
+        if time.monotonic() - self.checked_at >= self.cache_seconds:
+            if self._ping is None:
+                self._ping = asyncio.ensure_future(self._run_ping())
+            # shield(): a probe that disconnects must not cancel the shared ping
+            await asyncio.shield(self._ping)
+        return {
+            "ready": self.startup_complete and self.mongo_ok,
+            "startup_complete": self.startup_complete,
+            "mongodb": "ok" if self.mongo_ok else self.mongo_error,
+        }
+
+    async def _run_ping(self):
+        try:
+            db = database.db_manager.db
+            if db is None:
+                raise RuntimeError("not connected")
+            await asyncio.wait_for(db.command("ping"), timeout=self.timeout)
+            self.mongo_ok, self.mongo_error = True, None
+        except Exception as e:
+            self.mongo_ok, self.mongo_error = False, str(e) or type(e).__name__
+        finally:
+            self.checked_at = time.monotonic()
+            self._ping = None
+
+
+readiness = ReadinessProbe()
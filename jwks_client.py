@@ -0,0 +1,78 @@
+import json
+import logging
+import time
+import threading
+import urllib.request
+from typing import Optional
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+class JWKSClient:
+    """
+    Offline access token verification for downstream services.
+    Fetches the auth service's /.well-known/jwks.json, caches the keys, and
+    verifies tokens locally, so no call to /users/me is needed per request.
+
+    Example:
+        client = JWKSClient("http://localhost:8002/.well-known/jwks.json")
+        claims = client.verify(token)  # raises JWTError if invalid
+    """
+    def __init__(self, jwks_url: str, cache_seconds: int = 300, min_refresh_interval: int = 30, timeout: float = 5.0):
+        self.jwks_url = jwks_url
+        self.cache_seconds = cache_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.keys = {}
+        # monotonic() times of the last successful fetch and of the last
+        # attempt (successful or not), None before the first one
+        self.fetched_at: Optional[float] = None
+        self.attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        self.attempted_at = time.monotonic()
+        try:
+            with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+                jwks = json.load(response)
+            keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+        except Exception as e:
+            # Keep verifying with the cached keys; retried after min_refresh_interval
+            logger.warning("Could not fetch JWKS from %s: %s", self.jwks_url, e)
+            return
+        self.keys = keys
+        self.fetched_at = time.monotonic()
+
+    @staticmethod
+    def _since(timestamp: Optional[float]) -> float:
+        # monotonic() may be smaller than any interval right after boot, so
+        # "never" is infinitely long ago rather than "at 0"
+        return float("inf") if timestamp is None else time.monotonic() - timestamp
+
+    def get_key(self, kid: str) -> Optional[dict]:
+        key = self.keys.get(kid)
+        # Refetch when the cache is stale, or when an unknown kid appears (the
+        # signer rotated keys), but never try more often than min_refresh_interval
+        stale = self._since(self.fetched_at) > self.cache_seconds
+        if (stale or key is None) and self._since(self.attempted_at) > self.min_refresh_interval:
+            with self._lock:
+                if self._since(self.attempted_at) > self.min_refresh_interval:
+                    self._fetch()
+            key = self.keys.get(kid)
+        return key
+
+    def verify(self, token: str) -> dict:
+        """
+        Verify an access token's signature and expiry and return its claims.
+        Every failure, including an unknown key, raises JWTError.
+        """
+        header = jwt.get_unverified_header(token)
+        key = self.get_key(header.get("kid"))
+        if key is None:
+            raise JWTError(f"Unknown signing key: {header.get('kid')}")
+        if "alg" not in key:
+            raise JWTError(f"Signing key {header.get('kid')} has no algorithm")
+        claims = jwt.decode(token, key, algorithms=[key["alg"]])
+        if claims.get("typ") == "refresh":
+            raise JWTError("Refresh tokens cannot be used for authentication")
+        return claims
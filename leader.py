@@ -0,0 +1,70 @@
+import os
+import uuid
+import socket
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from pymongo.errors import DuplicateKeyError
+import database
+
+# --- CONFIGURATION ---
+# A worker keeps leadership by renewing its lease every LEADER_LEASE_SECONDS / 3;
+# if it dies, another worker takes over once the lease expires.
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", 30))
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """
+    Leader election through a lease document in the "leases" collection.
+    Every worker calls renew() periodically; only the current holder gets
+    is_leader == True, so scheduled jobs run exactly once per deployment.
+    """
+    collection_name = "leases"
+
+    def __init__(self, name: str, ttl_seconds: int = LEADER_LEASE_SECONDS):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    async def renew(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches when we already hold the lease or it has expired; otherwise
+            # the upsert collides with the current holder's document.
+            await database.db_manager.db[self.collection_name].find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True,
+            )
+            leader = True
+        except DuplicateKeyError:
+            leader = False
+        except Exception as e:
+            # Without a confirmed lease we must assume someone else may hold it
+            logger.warning("Lease renewal for %s failed: %s", self.name, e)
+            leader = False
+        if leader != self.is_leader:
+            logger.info("Worker %s %s lease %s", self.owner, "acquired" if leader else "lost", self.name)
+        self.is_leader = leader
+        return leader
+
+    async def release(self):
+        if self.is_leader:
+            await database.db_manager.db[self.collection_name].delete_one({"_id": self.name, "owner": self.owner})
+            self.is_leader = False
+
+    def only_leader(self, func):
+        """
+        Wrap a scheduler job so it only runs on the leader.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.is_leader:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+scheduler_lease = LeaderLease("scheduler")
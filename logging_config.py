@@ -1,39 +1,303 @@
 import logging
+import os
 import sys
+import json
+import queue
 import datetime
 import asyncio
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from pymongo.errors import OperationFailure
 import database
+import metrics
 
-def setup_logging():
+# --- CONFIGURATION ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text", or "json" for one JSON object per line on stdout
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+UVICORN_ACCESS_LOG_LEVEL = os.getenv("UVICORN_ACCESS_LOG_LEVEL", "INFO").upper()
+# Keep 1 of every N records below WARNING from high-volume loggers, as
+# comma-separated logger=N pairs, e.g. "uvicorn.access=100,main=10"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# Records are written to MongoDB in batches of up to LOG_BATCH_SIZE, at least
+# every LOG_FLUSH_INTERVAL seconds.
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 100))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 2.0))
+# Records held in memory while waiting for a flush. When the buffer is full the
+# policy decides what is lost: "drop_oldest" or "sample" (keep 1 of every
+# LOG_SAMPLE_EVERY new records).
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", 10000))
+LOG_BUFFER_POLICY = os.getenv("LOG_BUFFER_POLICY", "drop_oldest")
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", 10))
+# Log documents are deleted by a TTL index this many days after they were
+# written (0 keeps them forever).
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", 30))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+LOG_TIMESTAMP_INDEX = "timestamp_1"
+LOG_LEVEL_INDEX = [("level", 1), ("timestamp", 1)]
+
+
+logger = logging.getLogger(__name__)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the same fields as the "logs" collection.
+    """
+    def format(self, record):
+        document = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            document["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Logger filter passing 1 of every `every` records below WARNING.
+    Warnings and errors always pass.
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self.seen = 0
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        keep = self.seen % self.every == 0
+        self.seen += 1
+        if not keep:
+            self.dropped += 1
+        return keep
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records untouched: the listener thread does the %-formatting
+    and the writes, so a logging call on the event loop is only a queue put.
+    """
+    def prepare(self, record):
+        return record
+
+
+class BufferedMongoDBHandler(logging.Handler):
+    """
+    Logging handler that buffers records in memory and writes them to the
+    "logs" collection with insert_many from a single background task.
+    emit() never touches the event loop, so it is safe from any thread.
+    """
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 buffer_size=LOG_BUFFER_SIZE, policy=LOG_BUFFER_POLICY, sample_every=LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.sample_every = max(sample_every, 1)
+        self.buffer = deque()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._overflow_seen = 0
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self._task = None
+
+    def emit(self, record):
+        try:
+            log_document = {
+                "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc),
+                "level": record.levelname,
+                "message": record.getMessage(),
+                "logger": record.name,
+                "raw": self.format(record),
+            }
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self.lock:
+            if len(self.buffer) >= self.buffer_size:
+                if self.policy == "sample":
+                    self._overflow_seen += 1
+                    if self._overflow_seen % self.sample_every:
+                        self.dropped += 1
+                        return
+                self.buffer.popleft()
+                self.dropped += 1
+            self.buffer.append(log_document)
+            full = len(self.buffer) >= self.batch_size
+
+        # emit() runs on the listener thread; stop() may clear _wakeup meanwhile
+        wakeup = self._wakeup
+        if full and wakeup is not None:
+            self._loop.call_soon_threadsafe(wakeup.set)
+
+    async def start(self):
+        """
+        Start the background flusher on the running event loop.
+        """
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the flusher and write everything still buffered.
+        """
+        if self._task is not None:
+            # A flag rather than cancel(): wait_for() may swallow a cancellation
+            # that races with a wakeup from emit()
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        while self.buffer and database.db_manager.db is not None:
+            await self.flush_async()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self.buffer and database.db_manager.db is not None:
+                await self.flush_async()
+                if len(self.buffer) < self.batch_size:
+                    break
+
+    async def flush_async(self):
+        db = database.db_manager.db
+        if db is None:
+            return
+        with self.lock:
+            batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            self._overflow_seen = 0
+        if not batch:
+            return
+        try:
+            await db["logs"].insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception:
+            # Never log from here: it would feed records back into this handler
+            self.failed += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+async def ensure_log_indexes(db):
+    """
+    Index the "logs" collection for time-range and level queries and expire
+    old records. A changed LOG_RETENTION_DAYS is applied with collMod.
+    """
+    await asyncio.gather(_ensure_log_timestamp_index(db), db["logs"].create_index(LOG_LEVEL_INDEX))
+
+
+async def _ensure_log_timestamp_index(db):
+    logs = db["logs"]
+    if LOG_RETENTION_DAYS > 0:
+        expire_after = int(LOG_RETENTION_DAYS * 86400)
+        try:
+            await logs.create_index("timestamp", name=LOG_TIMESTAMP_INDEX, expireAfterSeconds=expire_after)
+        except OperationFailure as exc:
+            # IndexOptionsConflict: the index exists with another (or no) expiry
+            if exc.code != 85:
+                raise
+            await db.command("collMod", "logs", index={"name": LOG_TIMESTAMP_INDEX, "expireAfterSeconds": expire_after})
+    else:
+        try:
+            await logs.create_index("timestamp", name=LOG_TIMESTAMP_INDEX)
+        except OperationFailure as exc:
+            if exc.code != 85:
+                raise
+            logger.warning(
+                "LOG_RETENTION_DAYS is 0 but logs.%s still expires records; drop it to keep logs", LOG_TIMESTAMP_INDEX
+            )
+
+
+mongo_handler = BufferedMongoDBHandler()
+metrics.registry.register_gauges("log_mongodb_handler", mongo_handler.stats)
+
+# (logger, original handlers, listener) for every logger moved behind a queue
+_pipelines = []
+# (logger, filter) installed from LOG_SAMPLING
+_samplers = []
+
+
+def _move_to_queue(target: logging.Logger, handlers: list):
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    target.handlers = [DeferredQueueHandler(log_queue)]
+    _pipelines.append((target, handlers, listener))
+
+
+def _sampling_stats() -> dict:
+    return {"dropped": sum(sampler.dropped for _, sampler in _samplers)}
+
+
+metrics.registry.register_gauges("log_sampling", _sampling_stats)
+
+
+def setup_logging(stream=None):
     """
     Configure logging for the application.
+    Handlers run on a QueueListener thread, so logging never blocks the event
+    loop on console writes. Call `await mongo_handler.start()` once the event
+    loop is running, and `stop_logging()` then `await mongo_handler.stop()` on
+    shutdown to flush queued and buffered records.
+    """
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    mongo_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    _move_to_queue(root, [stream_handler, mongo_handler])
+
+    # Uvicorn's loggers do not propagate and write to the console themselves
+    for name in ("uvicorn", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        if uvicorn_logger.handlers and not uvicorn_logger.propagate:
+            _move_to_queue(uvicorn_logger, list(uvicorn_logger.handlers))
+    logging.getLogger("uvicorn.access").setLevel(UVICORN_ACCESS_LOG_LEVEL)
+
+    for entry in filter(None, (item.strip() for item in LOG_SAMPLING.split(","))):
+        name, _, every = entry.partition("=")
+        sampler = SamplingFilter(int(every))
+        logging.getLogger(name.strip()).addFilter(sampler)
+        _samplers.append((logging.getLogger(name.strip()), sampler))
+
+
+def stop_logging():
+    """
+    Drain the queues and put the handlers back on their loggers, so records
+    logged after shutdown are still written (synchronously).
     """
-    class MongoDBHandler(logging.Handler):
-        def emit(self, record):
-            if database.db_manager.db is not None:
-                log_entry = self.format(record)
-                log_document = {
-                    "timestamp": datetime.datetime.now(datetime.timezone.utc),
-                    "level": record.levelname,
-                    "message": record.getMessage(),
-                    "logger": record.name,
-                    "raw": log_entry
-                }
-                # Use asyncio.create_task to run the async insert without blocking
-                try:
-                    asyncio.create_task(database.db_manager.db["logs"].insert_one(log_document))
-                except Exception:
-                    # Fallback or ignore if event loop is closed or other issues
-                    pass
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            MongoDBHandler()
-        ]
-    )
-    
-    # Set lower level for some noisy libraries if needed
-    logging.getLogger("uvicorn.access").setLevel(logging.DEBUG)
+    while _pipelines:
+        target, handlers, listener = _pipelines.pop()
+        listener.stop()
+        target.handlers = handlers
+    while _samplers:
+        target, sampler = _samplers.pop()
+        target.removeFilter(sampler)
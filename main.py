@@ -1,74 +1,160 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from fastapi.middleware.cors import CORSMiddleware
 from datetime import timedelta, datetime
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pydantic import ValidationError
 from contextlib import asynccontextmanager
-import models, schemas, auth, database
-from logging_config import setup_logging
+import models, schemas, auth, database, metrics, migrate, signing_keys, api_keys, cors
+import responses
+from responses import FastJSONResponse
+from ratelimit import login_limiter
+from leader import scheduler_lease
+from logging_config import setup_logging, stop_logging, mongo_handler
+from page_cache import CachedPage
+from health import readiness
 import logging
 from pathlib import Path
-import certifi
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import json
+import os
+import asyncio
+import tempfile
+from typing import List, Optional
+
+# Set by serve.py, which creates the indexes once before starting the workers
+SKIP_INDEX_CREATION = os.getenv("SKIP_INDEX_CREATION", "false").lower() in ("1", "true", "yes")
+
+# Longest wait between retries of the background startup work (see finish_startup)
+STARTUP_RETRY_MAX_SECONDS = 30
+
+# Entries hashed and inserted together by /register/bulk
+BULK_REGISTER_CHUNK_SIZE = int(os.getenv("BULK_REGISTER_CHUNK_SIZE", 500))
+
+logger = logging.getLogger(__name__)
+
+# Landing page served from memory; set INDEX_HTML_RELOAD=true to pick up edits in development
+landing_page = CachedPage(
+    Path(__file__).parent / "index.html",
+    reload=os.getenv("INDEX_HTML_RELOAD", "false").lower() in ("1", "true", "yes"),
+)
 
 def print_time():
     """job to print time every minute."""
-    logger = logging.getLogger(__name__)
-    logger.info(f"Current time: {datetime.now()}")
+    logger.info("Current time: %s", datetime.now())
 
 
 # LIFECYCLE EVENTS
 
+async def start_scheduler():
+    """
+    Start the scheduler. Every worker renews the lease, but jobs only run on
+    the worker currently holding it.
+    """
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler  # imported here to keep it off the import path
+
+    await scheduler_lease.renew()
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(scheduler_lease.renew, 'interval', seconds=max(scheduler_lease.ttl_seconds // 3, 1))
+    scheduler.add_job(scheduler_lease.only_leader(print_time), 'interval', seconds=60)
+    scheduler.start()
+    return scheduler
+
+async def finish_startup(app: FastAPI):
+    """
+    Startup work that does not have to delay serving: pool warm-up, the
+    remaining index builds and the scheduler. Failures are retried with
+    backoff until they succeed; /readyz reports ready once this is done.
+    """
+    indexes_ready = SKIP_INDEX_CREATION
+    delay = 1.0
+    while True:
+        try:
+            # Open the pool before reporting ready so early requests skip the handshakes
+            await database.warm_up()
+            if not indexes_ready:
+                await migrate.ensure_indexes(database.db_manager.db)
+                indexes_ready = True
+                logger.info("MongoDB indexes ready.")
+            if app.state.scheduler is None:
+                app.state.scheduler = await start_scheduler()
+            break
+        except Exception:
+            logger.exception("Background startup failed; retrying in %.0f s", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+    readiness.startup_complete = True
+    logger.info("Worker %s ready.", os.getpid())
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup Logic
     setup_logging()
-    logger = logging.getLogger(__name__)
-    logger.info("Starting up: Connecting to MongoDB...")
-    database.db_manager.client = AsyncIOMotorClient(
-        database.MONGO_URL,
-        tls=True,
-        tlsCAFile=certifi.where()
-    )
-    database.db_manager.db = database.db_manager.client[database.DB_NAME]
-    
-    # Create unique index for username to ensure no duplicates
-    await database.db_manager.db["users"].create_index("username", unique=True)
-    logger.info("MongoDB connected and index created.")
+    logger.info("Starting up worker %s: Connecting to MongoDB...", os.getpid())
+    # Per-worker state: this Mongo client, the hashing pool, caches, rate limit
+    # buckets and the log buffer all belong to this process only.
+    database.connect()
 
-    # Start Scheduler
-    scheduler = AsyncIOScheduler()
-    scheduler.add_job(print_time, 'interval', seconds=60)
-    scheduler.start()
+    # Start writing buffered log records to MongoDB
+    await mongo_handler.start()
+
+    # Pick the password hashing cost (may calibrate), then start the workers
+    hash_cost = await asyncio.to_thread(auth.configure_password_hashing)
+    logger.info("Password hashing: schemes=%s cost=%s", auth.PASSWORD_SCHEMES, hash_cost or "default")
+    auth.hash_pool.start()
+
+    # Only the unique username index is built before serving: /register relies
+    # on it to reject duplicates. The others are built in finish_startup, and
+    # serve.py builds them all once instead.
+    if not SKIP_INDEX_CREATION:
+        await database.ensure_username_index(database.db_manager.db)
+
+    # Serve right away; the rest runs in the background and gates /readyz
+    app.state.scheduler = None
+    startup_task = asyncio.create_task(finish_startup(app))
     
     # The application runs while this yield is active
     yield
     
     # Shutdown Logic
-    scheduler.shutdown()
-    if database.db_manager.client:
-        database.db_manager.client.close()
-    logger.info("Shutting down: MongoDB connection closed.")
+    if not startup_task.done():
+        startup_task.cancel()
+        await asyncio.gather(startup_task, return_exceptions=True)
+    readiness.startup_complete = False
+    if app.state.scheduler is not None:
+        app.state.scheduler.shutdown()
+    await scheduler_lease.release()
+    auth.hash_pool.shutdown()
+    logger.info("Shutting down: Flushing logs and closing MongoDB connection.")
+    # Drain the logging queue into the handlers, then write the buffered records
+    stop_logging()
+    await mongo_handler.stop()
+    database.close()
 
 app = FastAPI(
     title="Sample FastAPI auth project",
     description="Distributed System Node Registry with OAuth2 + MongoDB Atlas",
     version="2.0.1",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Request latency per route; not installed at all when metrics are disabled
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # CORS Configuration
-# This is necessary when the frontend runs on a different port or origin.
-# We set allow_origins=["*"] for development simplicity, allowing any origin
-# to connect to the API. In production, you would replace "*" with your 
-# specific frontend domain (e.g., "https://yourfrontend.com").
+# Needed when a frontend on another origin calls the API. Allowed origins come
+# from CORS_ALLOW_ORIGINS / CORS_ALLOW_ORIGIN_REGEX (see cors.py). Added last so
+# it is the outermost middleware: preflights are answered right here, and the
+# long max_age lets browsers skip repeating them.
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
+    cors.CountingCORSMiddleware,
+    allow_origins=cors.CORS_ALLOW_ORIGINS,
+    allow_origin_regex=cors.CORS_ALLOW_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allows all headers
+    max_age=cors.CORS_MAX_AGE,
 )
 
 # PUBLIC ROUTES
@@ -79,15 +165,8 @@ async def register_user(user: schemas.UserCreate, db = Depends(database.get_db))
     Register a new Compute Node or Admin.
     Note the 'async def' and 'await' usage.
     """
-    logger = logging.getLogger(__name__)
-    logger.info(f"Registering user: {user.username}")
-    # Check if user exists
-    existing_user = await db["users"].find_one({"username": user.username})
-    if existing_user:
-        logger.warning(f"Registration failed: Username {user.username} already exists")
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    hashed_password = auth.get_password_hash(user.password)
+    logger.info("Registering user: %s", user.username)
+    hashed_password = await auth.hash_password_async(user.password)
     
     # Create User Dict (MongoDB Document)
     user_doc = models.UserInDB(
@@ -95,26 +174,130 @@ async def register_user(user: schemas.UserCreate, db = Depends(database.get_db))
         hashed_password=hashed_password
     ).model_dump()
     
-    # Insert into MongoDB
-    new_user = await db["users"].insert_one(user_doc)
+    # Insert into MongoDB. The unique index on username rejects duplicates,
+    # so there is no separate existence check (and no race with it).
+    try:
+        new_user = await db["users"].insert_one(user_doc)
+    except DuplicateKeyError:
+        logger.warning("Registration failed: Username %s already exists", user.username)
+        raise HTTPException(status_code=400, detail="Username already registered")
+    auth.invalidate_user(user.username)
     
-    # Fetch the created user to return it (to get the generated _id)
-    created_user = await db["users"].find_one({"_id": new_user.inserted_id})
+    # Build the response from the inserted document instead of reading it back
+    user_doc["_id"] = new_user.inserted_id
     
-    logger.info(f"User registered successfully: {user.username}")
-    return created_user
+    logger.info("User registered successfully: %s", user.username)
+    return user_doc
+
+async def _ndjson_lines(request: Request):
+    """
+    Yield the non-empty lines of a streamed request body.
+    """
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+async def _register_chunk(db, entries: list) -> list:
+    """
+    Validate, hash and insert one chunk of (index, raw line) bulk entries.
+    Returns one result dict per entry, in input order.
+    """
+    results = {}
+    users = []
+    for index, line in entries:
+        try:
+            users.append((index, schemas.UserCreate.model_validate_json(line)))
+        except ValidationError:
+            results[index] = {"index": index, "status": "invalid"}
+
+    if users:
+        hashed_passwords = await auth.hash_passwords_async([user.password for _, user in users])
+        user_docs = [
+            models.UserInDB(username=user.username, hashed_password=hashed_password).model_dump()
+            for (_, user), hashed_password in zip(users, hashed_passwords)
+        ]
+        # Unordered so one duplicate does not stop the rest of the chunk
+        write_errors = {}
+        try:
+            await db["users"].insert_many(user_docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+        for position, ((index, user), user_doc) in enumerate(zip(users, user_docs)):
+            result = {"index": index, "username": user.username}
+            error = write_errors.get(position)
+            if error is None:
+                result.update(status="created", id=str(user_doc["_id"]))
+                auth.invalidate_user(user.username)
+            elif error.get("code") == 11000:
+                result["status"] = "duplicate"
+            else:
+                result.update(status="error", detail=error.get("errmsg"))
+            results[index] = result
+
+    return [results[index] for index, _ in entries]
+
+def _iter_file(file):
+    with file:
+        yield from file
+
+@app.post("/register/bulk")
+async def register_users_bulk(request: Request, db = Depends(database.get_db), admin: dict = Depends(auth.require_admin)):
+    """
+    Register many Compute Nodes at once (admin only).
+    The body is NDJSON with one UserCreate object per line. It is processed
+    in chunks as it streams in, and the response is NDJSON with one result
+    per input line ("created", "duplicate", "invalid" or "error").
+    """
+    logger.info("Bulk registration started by: %s", admin["username"])
+    # Results spill to disk past 1 MB so large batches run in constant memory
+    results = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    counts = {}
+    chunk = []
+    index = 0
+
+    async def flush(chunk):
+        for result in await _register_chunk(db, chunk):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            results.write(json.dumps(result).encode() + b"\n")
+
+    async for line in _ndjson_lines(request):
+        chunk.append((index, line))
+        index += 1
+        if len(chunk) >= BULK_REGISTER_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+
+    logger.info("Bulk registration finished: %s", counts)
+    results.seek(0)
+    return StreamingResponse(_iter_file(results), media_type="application/x-ndjson")
 
 @app.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(database.get_db)):
+async def login_for_access_token(request: Request, background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(database.get_db)):
     """
     OAuth2 compliant token login.
     """
-    logger = logging.getLogger(__name__)
-    logger.info(f"Login attempt for user: {form_data.username}")
-    user = await db["users"].find_one({"username": form_data.username})
+    logger.info("Login attempt for user: %s", form_data.username)
+    # Throttle before any bcrypt work is spent on this attempt
+    client_ip = request.client.host if request.client else "unknown"
+    try:
+        await login_limiter.check(form_data.username, client_ip)
+    except HTTPException:
+        logger.warning("Login rate limited for user: %s from %s", form_data.username, client_ip)
+        raise
+    user = await database.find_user_for_login(db, form_data.username)
     
-    if not user or not auth.verify_password(form_data.password, user["hashed_password"]):
-        logger.warning(f"Login failed for user: {form_data.username}")
+    hashed_password = user["hashed_password"] if user else None
+    if not await auth.verify_password_or_dummy(form_data.password, hashed_password):
+        logger.warning("Login failed for user: %s", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -123,22 +306,25 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
-    )
-    refresh_token = auth.create_refresh_token(
-        data={"sub": user["username"]}
+        data=auth.access_token_claims(user), expires_delta=access_token_expires
     )
-    logger.info(f"Login successful for user: {form_data.username}")
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    refresh_token = await auth.issue_refresh_token(user["username"])
+    login_limiter.reset(form_data.username)
+    # Upgrade outdated hashes after the response is sent
+    if auth.password_needs_update(hashed_password):
+        background_tasks.add_task(
+            auth.upgrade_password_hash, db, user["username"], hashed_password, form_data.password
+        )
+    logger.info("Login successful for user: %s", form_data.username)
+    return FastJSONResponse(schemas.token_content(access_token, refresh_token))
 
 @app.post("/refresh", response_model=schemas.Token)
 async def refresh_token(refresh_token: str = Depends(auth.oauth2_scheme), db = Depends(database.get_db)):
     """
     Get a new access token using a refresh token.
     """
-    logger = logging.getLogger(__name__)
     try:
-        username = auth.verify_refresh_token(refresh_token)
+        payload = auth.verify_refresh_token(refresh_token)
     except HTTPException:
         logger.warning("Refresh token validation failed")
         raise HTTPException(
@@ -146,11 +332,23 @@ async def refresh_token(refresh_token: str = Depends(auth.oauth2_scheme), db = D
             detail="Invalid refresh token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    username = payload["sub"]
     
-    # Check if user still exists
-    user = await db["users"].find_one({"username": username})
+    # Rotate: consume the (single-use) refresh token, check the user still
+    # exists and record the new token (same family) in one concurrent round-trip
+    try:
+        user, new_refresh_token = await auth.rotate_refresh_token(
+            payload, lambda: database.find_user_for_refresh(db, username, with_claims=auth.TRUSTED_CLAIMS)
+        )
+    except HTTPException:
+        logger.warning("Refresh failed: Refresh token for %s already used or revoked", username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     if not user:
-        logger.warning(f"Refresh failed: User {username} not found")
+        logger.warning("Refresh failed: User %s not found", username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
@@ -159,30 +357,86 @@ async def refresh_token(refresh_token: str = Depends(auth.oauth2_scheme), db = D
     
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": username}, expires_delta=access_token_expires
-    )
-    # Optionally rotate refresh token here
-    new_refresh_token = auth.create_refresh_token(
-        data={"sub": username}
+        data=auth.access_token_claims({**user, "username": username}), expires_delta=access_token_expires
     )
     
-    logger.info(f"Token refreshed for user: {username}")
-    return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+    logger.info("Token refreshed for user: %s", username)
+    return FastJSONResponse(schemas.token_content(access_token, new_refresh_token))
 
 
 # PROTECTED ROUTES
 
 @app.get("/users/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: dict = Depends(auth.get_current_user)):
+async def read_users_me(current_user: dict = Depends(auth.require_user)):
     """
     Get details of the currently logged-in user.
     """
-    return current_user
+    # Returned as a response directly; response_model only documents the shape
+    return FastJSONResponse(schemas.user_response_content(current_user))
+
+@app.get("/users", response_model=schemas.UserPage)
+async def read_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    db = Depends(database.get_db),
+    admin: dict = Depends(auth.require_admin),
+):
+    """
+    List registered users/nodes in username order (admin only).
+    Pass the returned next_cursor as ?cursor= to get the following page.
+    """
+    users = await database.list_users(db, limit, after=cursor, role=role, is_active=is_active)
+    return FastJSONResponse({
+        "items": [schemas.user_response_content(user) for user in users],
+        "next_cursor": users[-1]["username"] if len(users) == limit else None,
+    })
+
+async def _ndjson_users(users, lines_per_chunk: int = 1000):
+    """
+    Serialize a user cursor to NDJSON, a few hundred KB per chunk at most.
+    """
+    lines = []
+    async for user in users:
+        lines.append(responses.dumps(schemas.user_response_content(user)))
+        if len(lines) >= lines_per_chunk:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+@app.get("/users/export")
+async def export_users(
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    db = Depends(database.get_db),
+    admin: dict = Depends(auth.require_admin),
+):
+    """
+    Stream every matching user as NDJSON, one UserResponse per line (admin only).
+    Rows are read from the cursor as they are sent, in constant memory.
+    """
+    logger.info("User export started by: %s", admin["username"])
+    users = database.iter_users(db, role=role, is_active=is_active)
+    return StreamingResponse(_ndjson_users(users), media_type="application/x-ndjson")
+
+@app.post("/users/{username}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(username: str, db = Depends(database.get_db), admin: dict = Depends(auth.require_admin)):
+    """
+    Log a user out everywhere (admin only): their refresh tokens stop working
+    at once and, in trusted claims mode, their access tokens within
+    TOKEN_REVOCATION_REFRESH_SECONDS on every worker.
+    """
+    if await auth.revoke_user_tokens(db, username) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info("Tokens of user %s revoked by: %s", username, admin["username"])
 
 @app.get("/system/status")
-async def get_system_status(current_user: dict = Depends(auth.get_current_user)):
+async def get_system_status(current_user: dict = Depends(api_keys.require_user_or_api_key)):
     """
     Simulates a secure command endpoint for distributed nodes.
+    Accepts a bearer token or a node API key (X-API-Key header).
     """
     return {
         "status": "operational",
@@ -193,15 +447,102 @@ async def get_system_status(current_user: dict = Depends(auth.get_current_user))
     }
 
 
+# API KEYS
+# Managed with a bearer token only, so a leaked API key cannot mint new keys.
+
+def _api_key_owner(current_user: dict, username: Optional[str]) -> str:
+    """
+    Whose keys a request manages: the caller's, or anyone's for admins.
+    """
+    if username is None or username == current_user["username"]:
+        return current_user["username"]
+    if current_user.get("role") != auth.ADMIN_ROLE:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrator role required")
+    return username
+
+@app.post("/api-keys", response_model=schemas.APIKeyCreated)
+async def create_api_key(key: schemas.APIKeyCreate, db = Depends(database.get_db), current_user: dict = Depends(auth.require_user)):
+    """
+    Issue a long-lived API key for a node. The key is only returned here.
+    """
+    username = _api_key_owner(current_user, key.username)
+    if username != current_user["username"] and await database.find_user_for_auth(db, username) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    key_doc, api_key = await api_keys.issue_key(db, username, key.name)
+    logger.info("API key %s issued for user: %s", key_doc["prefix"], username)
+    return {**key_doc, "api_key": api_key}
+
+@app.get("/api-keys", response_model=List[schemas.APIKeyResponse])
+async def read_api_keys(username: Optional[str] = None, db = Depends(database.get_db), current_user: dict = Depends(auth.require_user)):
+    """
+    List the caller's API keys (admins may pass ?username=).
+    """
+    return await api_keys.list_keys(db, _api_key_owner(current_user, username))
+
+@app.delete("/api-keys/{prefix}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_api_key(prefix: str, db = Depends(database.get_db), current_user: dict = Depends(auth.require_user)):
+    """
+    Revoke an API key. Admins can revoke anyone's key.
+    """
+    owner = None if current_user.get("role") == auth.ADMIN_ROLE else current_user["username"]
+    if not await api_keys.revoke_key(db, prefix, owner):
+        raise HTTPException(status_code=404, detail="API key not found")
+    logger.info("API key %s revoked by: %s", prefix, current_user["username"])
+
+
+# PUBLIC KEYS
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def get_jwks(request: Request):
+    """
+    Public signing keys (JWKS) so other services can verify tokens locally.
+    Empty when tokens are signed with the shared HS256 secret.
+    """
+    key_ring = auth.key_ring
+    headers = {"Cache-Control": f"public, max-age={signing_keys.JWKS_CACHE_SECONDS}"}
+    if key_ring.jwks_etag:
+        headers["ETag"] = key_ring.jwks_etag
+        if request.headers.get("if-none-match") == key_ring.jwks_etag:
+            return Response(status_code=304, headers=headers)
+    return Response(key_ring.jwks_body, media_type="application/json", headers=headers)
+
+
+# MONITORING
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """
+    Liveness: the worker is running and its event loop responds. No I/O.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Readiness: background startup finished and MongoDB answers (ping cached
+    for READINESS_CACHE_SECONDS). 503 until then, so no traffic is routed here.
+    """
+    result = await readiness.check()
+    return FastJSONResponse(result, status_code=200 if result["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus text exposition of request, stage and MongoDB metrics.
+    """
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Sample UI
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
     """
-    Reads the index.html file and serves it.
+    Serves index.html from memory (gzip/brotli, ETag and 304 support).
     """
     try:
-        with open("index.html", "r") as f:
-            return f.read()
+        return landing_page.response(request)
     except FileNotFoundError:
         print("ERROR: File not found")
         return "<h1>Error: index.html not found. Please ensure it is in the same directory as main.py.</h1>"
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from pymongo import monitoring
+
+# --- CONFIGURATION ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., count, sum]
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self.values.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics and gauge callbacks rendered at /metrics.
+    Gauge callbacks return {name: value} dicts and are evaluated lazily, so
+    components such as caches only need to keep plain counters.
+    """
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_gauges(self, prefix: str, callback):
+        self.gauges.append((prefix, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for prefix, callback in self.gauges:
+            for name, value in callback().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{name} gauge")
+                    lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+stage_duration = registry.register(Histogram(
+    "auth_stage_duration_seconds", "Time spent per processing stage (hash, jwt, db, serialization).", ("stage",)))
+mongo_commands = registry.register(Counter(
+    "mongodb_commands_total", "MongoDB commands sent, by outcome.", ("command", "outcome")))
+mongo_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ("command",)))
+
+_noop = nullcontext()
+
+
+@contextmanager
+def _timed_stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - started, name)
+
+
+def stage(name: str):
+    """
+    Context manager timing a processing stage, e.g. `with metrics.stage("jwt"):`.
+    Returns a shared no-op when metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return _noop
+    return _timed_stage(name)
+
+
+def observe_stage(name: str, seconds: float):
+    if METRICS_ENABLED:
+        stage_duration.observe(seconds, name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route template
+    (e.g. "/users/me"), so unbounded raw paths never become label values.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            http_duration.observe(time.perf_counter() - started, scope["method"], route_path)
+            http_requests.inc(scope["method"], route_path, status_code)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    PyMongo command listener counting commands and recording their latency.
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        mongo_commands.inc(event.command_name, "success")
+        mongo_duration.observe(seconds, event.command_name)
+        stage_duration.observe(seconds, "db")
+
+    def failed(self, event):
+        mongo_commands.inc(event.command_name, "failure")
+        mongo_duration.observe(event.duration_micros / 1e6, event.command_name)
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import database
+import auth
+import api_keys
+from logging_config import ensure_log_indexes
+from ratelimit import login_limiter
+
+async def ensure_indexes(db):
+    """
+    Create every index the application relies on. Safe to run repeatedly;
+    serve.py runs it once before starting the workers.
+    """
+    # Independent builds, so they run concurrently: one round-trip, not a dozen
+    await asyncio.gather(
+        database.ensure_user_indexes(db),
+        auth.refresh_store.ensure_indexes(db),
+        auth.revocations.ensure_indexes(db),
+        login_limiter.ensure_indexes(db),
+        api_keys.ensure_indexes(db),
+        ensure_log_indexes(db),
+    )
+
+async def migrate():
+    db = database.connect()
+    try:
+        await ensure_indexes(db)
+    finally:
+        database.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Creating MongoDB indexes...")
+    asyncio.run(migrate())
+    print("Done.")
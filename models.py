@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import Optional
 
 class UserInDB(BaseModel):
@@ -11,7 +12,20 @@ class UserInDB(BaseModel):
     hashed_password: str
     is_active: bool = True
     role: str = "role_user"
+    # Incremented to revoke every token issued with trusted claims
+    token_version: int = 0
     
     class Config:
         # Helper to allow Pydantic to work seamlessly with MongoDB BSON dicts
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+class APIKeyInDB(BaseModel):
+    """
+    A node API key as stored in the "api_keys" collection. Only an HMAC of
+    the secret part is kept; the prefix identifies the key.
+    """
+    prefix: str
+    key_hash: str
+    username: str
+    name: str
+    created_at: datetime
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+from pathlib import Path
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+class CachedPage:
+    """
+    A static page held in memory together with precompressed variants.
+    Responses carry a strong ETag, so revalidation is answered with 304.
+    With reload=True the file's mtime is checked on each request (development).
+    """
+    def __init__(self, path: Path, cache_control: str = "public, max-age=300", reload: bool = False):
+        self.path = path
+        self.cache_control = cache_control
+        self.reload = reload
+        self.mtime = None
+        self.variants = {}
+        self.etag = None
+
+    def load(self):
+        stat = self.path.stat()
+        body = self.path.read_bytes()
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body)
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.mtime = stat.st_mtime
+
+    def _refresh(self):
+        if self.mtime is None or (self.reload and self.path.stat().st_mtime != self.mtime):
+            self.load()
+
+    @staticmethod
+    def _quality_values(accept_encoding: str) -> dict:
+        """
+        Accept-Encoding as {coding: q}, e.g. "gzip;q=0.5, br" -> {"gzip": 0.5, "br": 1.0}.
+        """
+        accepted = {}
+        for part in accept_encoding.lower().split(","):
+            coding, *params = [item.strip() for item in part.split(";")]
+            if not coding:
+                continue
+            q = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            accepted[coding] = q
+        return accepted
+
+    def _encoding(self, accept_encoding: str) -> str:
+        accepted = self._quality_values(accept_encoding)
+        default = accepted.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        # Highest q wins; ties go to the smaller body (br, then gzip). q=0 refuses a coding.
+        for encoding in ("br", "gzip"):
+            q = accepted.get(encoding, default)
+            if encoding in self.variants and q > best_q:
+                best, best_q = encoding, q
+        identity_q = accepted.get("identity", default if "*" in accepted else 1.0)
+        return "identity" if identity_q > best_q else best
+
+    def response(self, request: Request, media_type: str = "text/html; charset=utf-8") -> Response:
+        self._refresh()
+        encoding = self._encoding(request.headers.get("accept-encoding", ""))
+        # Each encoding gets its own strong validator, as required for byte-different bodies
+        etag = self.etag if encoding == "identity" else self.etag[:-1] + "-" + encoding + '"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=media_type, headers=headers)
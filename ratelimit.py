@@ -0,0 +1,146 @@
+import os
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+import database
+import metrics
+
+# --- CONFIGURATION ---
+# Login attempts allowed per minute, per username and per client IP. The
+# bucket starts full, so this is also the allowed burst. 0 disables the limit.
+LOGIN_ATTEMPTS_PER_MINUTE_USER = int(os.getenv("LOGIN_ATTEMPTS_PER_MINUTE_USER", 10))
+LOGIN_ATTEMPTS_PER_MINUTE_IP = int(os.getenv("LOGIN_ATTEMPTS_PER_MINUTE_IP", 60))
+# Number of usernames/IPs tracked in memory before the least recent are dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Also count attempts in MongoDB so limits hold across workers and nodes
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "false").lower() in ("1", "true", "yes")
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by an arbitrary string, refilled
+    continuously at `per_minute` tokens per minute. per_minute <= 0 disables
+    the limit.
+    """
+    def __init__(self, per_minute: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.enabled = per_minute > 0
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, last = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - last) * self.rate)
+
+    def wait_time(self, key: str) -> float:
+        """
+        Seconds until a token is available for `key` (0 if one is), without
+        taking it.
+        """
+        if not self.enabled:
+            return 0.0
+        tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key: str):
+        """
+        Take one token; call after wait_time() returned 0.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        self.buckets[key] = (max(self._tokens(key, now) - 1, 0.0), now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+
+    def reset(self, key: str):
+        self.buckets.pop(key, None)
+
+
+class MongoWindowCounter:
+    """
+    Fixed one-minute windows counted in the "login_attempts" collection, so
+    every worker sees the same totals. Old windows expire via a TTL index.
+    """
+    collection_name = "login_attempts"
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index("expires_at", expireAfterSeconds=0)
+
+    async def acquire(self, key: str, per_minute: int) -> float:
+        if per_minute <= 0:
+            return 0.0
+        now = time.time()
+        window = int(now // 60)
+        counter = await database.db_manager.db[self.collection_name].find_one_and_update(
+            {"_id": f"{key}:{window}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expires_at": datetime.now(timezone.utc) + timedelta(minutes=2)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if counter["count"] <= per_minute:
+            return 0.0
+        return (window + 1) * 60 - now
+
+
+class LoginRateLimiter:
+    """
+    Throttles /token by username and client IP before any password hashing
+    happens, so a credential-stuffing burst cannot exhaust the hash workers.
+    """
+    def __init__(self):
+        self.by_user = TokenBucketLimiter(LOGIN_ATTEMPTS_PER_MINUTE_USER)
+        self.by_ip = TokenBucketLimiter(LOGIN_ATTEMPTS_PER_MINUTE_IP)
+        self.shared = MongoWindowCounter() if RATE_LIMIT_SHARED else None
+        self.rejected = 0
+
+    async def ensure_indexes(self, db):
+        if self.shared is not None:
+            await self.shared.ensure_indexes(db)
+
+    async def check(self, username: str, client_ip: str):
+        user_key, ip_key = f"user:{username}", f"ip:{client_ip}"
+        # Both buckets are checked before either is debited: an attempt the IP
+        # limit rejects must not use up the targeted username's budget
+        retry_after = max(self.by_user.wait_time(user_key), self.by_ip.wait_time(ip_key))
+        if not retry_after:
+            self.by_user.take(user_key)
+            self.by_ip.take(ip_key)
+        if not retry_after and self.shared is not None:
+            # Shared counters cannot be checked without counting: the IP goes
+            # first, and the username is only counted if the IP is allowed
+            retry_after = await self.shared.acquire(ip_key, LOGIN_ATTEMPTS_PER_MINUTE_IP)
+            if not retry_after:
+                retry_after = await self.shared.acquire(user_key, LOGIN_ATTEMPTS_PER_MINUTE_USER)
+        if retry_after:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def reset(self, username: str):
+        """
+        Forget failed attempts for a username after a successful login.
+        """
+        self.by_user.reset(f"user:{username}")
+
+    def stats(self) -> dict:
+        return {
+            "tracked_users": len(self.by_user.buckets),
+            "tracked_ips": len(self.by_ip.buckets),
+            "rejected": self.rejected,
+        }
+
+
+login_limiter = LoginRateLimiter()
+metrics.registry.register_gauges("auth_login_limiter", login_limiter.stats)
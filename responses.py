@@ -0,0 +1,28 @@
+import json
+from fastapi.responses import JSONResponse
+import metrics
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize to compact JSON bytes, the same way FastJSONResponse does
+    (e.g. for streamed NDJSON lines).
+    """
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class: renders with orjson when installed and records
+    rendering time as the "serialization" stage.
+    """
+    def render(self, content) -> bytes:
+        with metrics.stage("serialization"):
+            return dumps(content)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, BeforeValidator, Field
+from datetime import datetime
 from typing import Optional, List, Annotated
 
 # --- ObjectId Helper ---
@@ -29,4 +30,51 @@ class UserResponse(UserBase):
 
     class Config:
         populate_by_name = True
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    # Pass as ?cursor= to get the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+# --- API Key Schemas ---
+class APIKeyCreate(BaseModel):
+    name: str
+    # Issue the key for another user (admins only); defaults to the caller
+    username: Optional[str] = None
+
+class APIKeyResponse(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    prefix: str
+    name: str
+    username: str
+    created_at: datetime
+
+    class Config:
+        populate_by_name = True
+
+class APIKeyCreated(APIKeyResponse):
+    # The full key; it is not stored and cannot be shown again
+    api_key: str
+
+# --- Fast Serialization ---
+# Hot endpoints return these plain dicts in a FastJSONResponse, which skips
+# FastAPI's response_model validation and jsonable_encoder pass. They must
+# produce exactly the JSON the matching schema would.
+def user_response_content(user: dict) -> dict:
+    """
+    UserResponse JSON built directly from a user document.
+    """
+    user_id = user.get("_id")
+    return {
+        "username": user["username"],
+        "_id": str(user_id) if user_id is not None else None,
+        "is_active": user["is_active"],
+        "role": user["role"],
+    }
+
+def token_content(access_token: str, refresh_token: str) -> dict:
+    """
+    Token JSON for a freshly issued access/refresh token pair.
+    """
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import os
+import uvicorn
+
+def main():
+    """
+    Production launcher: creates the MongoDB indexes once, then starts
+    Uvicorn with several worker processes that skip index creation.
+    """
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    # Split the cores between web workers and their bcrypt pools instead of
+    # letting every worker start one hashing process per core
+    os.environ.setdefault("HASH_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+
+    import auth
+    if not os.getenv("PASSWORD_HASH_COST") and os.getenv("PASSWORD_HASH_TARGET_MS"):
+        # Calibrate once here; workers calibrating concurrently would slow each other down
+        hash_cost = auth.configure_password_hashing()
+        if hash_cost is not None:
+            os.environ["PASSWORD_HASH_COST"] = str(hash_cost)
+
+    import migrate
+    print("Creating MongoDB indexes...")
+    asyncio.run(migrate.migrate())
+    os.environ["SKIP_INDEX_CREATION"] = "true"
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, proxy_headers=True)
+
+if __name__ == "__main__":
+    main()
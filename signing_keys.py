@@ -0,0 +1,134 @@
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+from jose import JWTError, jwk, jwt
+
+# --- CONFIGURATION ---
+load_dotenv()
+# HS256 signs with SECRET_KEY (shared secret). RS256/ES256 sign with the
+# private keys in JWT_KEYS_DIR and publish the public halves as a JWKS, so
+# other services can verify tokens without the secret or a network call.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# Directory of PEM files named <kid>.pem. Private keys can sign; public-only
+# keys (e.g. retired signing keys) are still accepted for verification.
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")
+# kid used for new tokens; defaults to the last private key in sort order
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWKS_CACHE_SECONDS = int(os.getenv("JWKS_CACHE_SECONDS", 300))
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class KeyRing:
+    """
+    Signing and verification keys for access and refresh tokens.
+    Several keys can be active at once: tokens carry a "kid" header naming
+    the key that signed them, which allows zero-downtime rotation.
+    """
+    def __init__(self, algorithm: str, secret_key: Optional[str] = None, keys_dir: Optional[str] = None,
+                 active_kid: Optional[str] = None):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.private_keys = {}
+        self.public_keys = {}
+        self.active_kid = None
+        self.jwks_body = b'{"keys":[]}'
+        self.jwks_etag = None
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            self._load(Path(keys_dir), active_kid)
+        elif not algorithm.startswith("HS"):
+            raise ValueError(f"Unsupported JWT_ALGORITHM: {algorithm}")
+
+    def _load(self, keys_dir: Path, active_kid: Optional[str]):
+        # cryptography is only imported for asymmetric keys; HS256 never needs it
+        from cryptography.hazmat.primitives import serialization
+        for path in sorted(keys_dir.glob("*.pem")):
+            kid = path.stem
+            pem = path.read_bytes()
+            try:
+                private_key = serialization.load_pem_private_key(pem, password=None)
+            except ValueError:
+                public_pem = pem
+            else:
+                self.private_keys[kid] = pem.decode()
+                public_pem = private_key.public_key().public_bytes(
+                    serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+                )
+            self.public_keys[kid] = public_pem.decode()
+
+        if not self.private_keys:
+            raise ValueError(f"No private signing keys found in {keys_dir}")
+        self.active_kid = active_kid or list(self.private_keys)[-1]
+        if self.active_kid not in self.private_keys:
+            raise ValueError(f"JWT_ACTIVE_KID {self.active_kid} has no private key in {keys_dir}")
+
+        keys = []
+        for kid, public_pem in self.public_keys.items():
+            key = jwk.construct(public_pem, self.algorithm).to_dict()
+            key.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(key)
+        # Serialized once; the JWKS endpoint serves these bytes as they are
+        self.jwks_body = json.dumps({"keys": keys}, separators=(",", ":")).encode()
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_body).hexdigest()[:32] + '"'
+
+    def encode(self, claims: dict) -> str:
+        if self.algorithm.startswith("HS"):
+            return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(
+            claims,
+            self.private_keys[self.active_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.active_kid},
+        )
+
+    def decode(self, token: str) -> dict:
+        """
+        Verify a token with the key named by its kid header. Raises JWTError.
+        """
+        if self.algorithm.startswith("HS"):
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        kid = jwt.get_unverified_header(token).get("kid")
+        public_key = self.public_keys.get(kid)
+        if public_key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return jwt.decode(token, public_key, algorithms=[self.algorithm])
+
+
+def generate_key(algorithm: str, keys_dir: str, kid: Optional[str] = None) -> Path:
+    """
+    Write a new private key to <keys_dir>/<kid>.pem. The default kid sorts
+    after existing ones, so it becomes the active key on the next start.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    kid = kid or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    path = Path(keys_dir) / f"{kid}.pem"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    os.chmod(path, 0o600)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a JWT signing key.")
+    parser.add_argument("--alg", default=JWT_ALGORITHM if JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS else "RS256",
+                        choices=ASYMMETRIC_ALGORITHMS)
+    parser.add_argument("--dir", default=JWT_KEYS_DIR, help="Directory holding the signing keys")
+    parser.add_argument("--kid", help="Key ID (default: current UTC timestamp)")
+    args = parser.parse_args()
+    print(f"Wrote {generate_key(args.alg, args.dir, args.kid)}")
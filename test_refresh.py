@@ -83,5 +83,25 @@ def test_refresh_flow():
         print(f"New access token invalid: {response.status_code}")
         sys.exit(1)
 
+    # 5. Reusing the old (rotated) Refresh Token must fail and revoke its family
+    print("\n5. Reusing old Refresh Token...")
+    headers = {"Authorization": f"Bearer {refresh_token}"}
+    response = requests.post(refresh_url, headers=headers)
+    
+    if response.status_code == 401:
+        print("Old refresh token correctly rejected.")
+    else:
+        print(f"Old refresh token was accepted: {response.status_code}")
+        sys.exit(1)
+
+    headers = {"Authorization": f"Bearer {new_refresh_token}"}
+    response = requests.post(refresh_url, headers=headers)
+    
+    if response.status_code == 401:
+        print("Token family correctly revoked after reuse.")
+    else:
+        print(f"Token family still valid after reuse: {response.status_code}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     test_refresh_flow()
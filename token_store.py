@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import heapq
+from datetime import datetime, timezone
+import database
+
+# --- CONFIGURATION ---
+# "mongo" shares refresh token state between workers and nodes; "memory" is
+# faster but only correct for a single process.
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "mongo")
+
+# Results of RefreshTokenStore.consume()
+CONSUMED = "consumed"
+REUSED = "reused"
+UNKNOWN = "unknown"
+
+
+class MemoryRefreshTokenStore:
+    """
+    Refresh token state kept in process memory, with expired entries evicted
+    lazily in expiry order.
+    """
+    def __init__(self):
+        self.tokens = {}
+        self.families = {}
+        self._expiry = []
+
+    async def ensure_indexes(self, db):
+        pass
+
+    async def add(self, jti: str, family: str, username: str, expires_at: datetime):
+        self._evict()
+        expires = expires_at.timestamp()
+        self.tokens[jti] = {"family": family, "username": username, "expires_at": expires, "used": False}
+        self.families.setdefault(family, set()).add(jti)
+        heapq.heappush(self._expiry, (expires, jti))
+
+    async def consume(self, jti: str) -> str:
+        token = self.tokens.get(jti)
+        if token is None or token["expires_at"] <= time.time():
+            return UNKNOWN
+        if token["used"]:
+            return REUSED
+        token["used"] = True
+        return CONSUMED
+
+    async def revoke_family(self, family: str):
+        for jti in self.families.get(family, ()):
+            self.tokens[jti]["used"] = True
+
+    async def restore(self, jti: str):
+        token = self.tokens.get(jti)
+        if token is not None:
+            token["used"] = False
+
+    async def discard(self, jti: str):
+        self._remove(jti)
+
+    async def revoke_user(self, username: str):
+        for jti in [jti for jti, token in self.tokens.items() if token["username"] == username]:
+            self._remove(jti)
+
+    def _evict(self):
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry)
+            self._remove(jti)
+
+    def _remove(self, jti: str):
+        token = self.tokens.pop(jti, None)
+        if token is not None:
+            family = self.families.get(token["family"])
+            if family is not None:
+                family.discard(jti)
+                if not family:
+                    del self.families[token["family"]]
+
+
+class MongoRefreshTokenStore:
+    """
+    Refresh token state in the "refresh_tokens" collection. Documents are keyed
+    by jti and removed by a TTL index once the token expires.
+    """
+    collection_name = "refresh_tokens"
+
+    def _collection(self):
+        return database.db_manager.db[self.collection_name]
+
+    async def ensure_indexes(self, db):
+        collection = db[self.collection_name]
+        await asyncio.gather(
+            collection.create_index("expires_at", expireAfterSeconds=0),
+            collection.create_index("family"),
+            collection.create_index("username"),
+        )
+
+    async def add(self, jti: str, family: str, username: str, expires_at: datetime):
+        await self._collection().insert_one({
+            "_id": jti,
+            "family": family,
+            "username": username,
+            "expires_at": expires_at,
+            "used": False,
+        })
+
+    async def consume(self, jti: str) -> str:
+        # One atomic round-trip in the common case
+        token = await self._collection().find_one_and_update(
+            {"_id": jti, "used": False, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"$set": {"used": True}},
+            projection={"_id": 1},
+        )
+        if token is not None:
+            return CONSUMED
+        existing = await self._collection().find_one({"_id": jti}, projection={"used": 1})
+        return REUSED if existing is not None and existing["used"] else UNKNOWN
+
+    async def revoke_family(self, family: str):
+        await self._collection().update_many({"family": family}, {"$set": {"used": True}})
+
+    async def restore(self, jti: str):
+        await self._collection().update_one({"_id": jti}, {"$set": {"used": False}})
+
+    async def discard(self, jti: str):
+        await self._collection().delete_one({"_id": jti})
+
+    async def revoke_user(self, username: str):
+        # Deleted rather than marked used: presenting one later is not token reuse
+        await self._collection().delete_many({"username": username})
+
+
+def create_refresh_token_store():
+    if REFRESH_TOKEN_STORE == "memory":
+        return MemoryRefreshTokenStore()
+    if REFRESH_TOKEN_STORE == "mongo":
+        return MongoRefreshTokenStore()
+    raise ValueError(f"Unknown REFRESH_TOKEN_STORE: {REFRESH_TOKEN_STORE}")